@@ -0,0 +1,284 @@
+"""Benchmark checking and fixing on a reproducible synthetic corpus."""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+
+import auto_client
+from auto_doc import AutoDoc
+from auto_check import Checker, IGNORED_CODES
+from auto_detect import FIXED_CODES
+from auto_stats import FileStats, PHASES, percentile
+
+# a definition whose docstring has one violation of the error code, {body} is filled with code
+# indented by the number of spaces that follows the template
+TEMPLATES = {
+    "D200": ('def {name} (x):\n    """\n    Return the value of {name}.\n    """\n{body}', 4),
+    "D202": ('def {name} (x):\n    """Return the value of {name}."""\n\n{body}', 4),
+    "D204": ('class {name} (object):\n    """Hold the value of {name}."""\n'
+             '    def get (self, x):\n        """Return the value."""\n{body}', 8),
+    "D205": ('def {name} (x):\n    """Return the value of {name}.\n    It is computed from x.\n    """\n{body}', 4),
+    "D210": ('def {name} (x):\n    """  Return the value of {name}.  """\n{body}', 4),
+    "D300": ("def {name} (x):\n    '''Return the value of {name}.'''\n{body}", 4),
+    "D301": ('def {name} (x):\n    """Return the value of {name} matching \\d+."""\n{body}', 4),
+    "D400": ('def {name} (x):\n    """Return the value of {name}"""\n{body}', 4),
+    "D403": ('def {name} (x):\n    """return the value of {name}."""\n{body}', 4),
+    "D412": ('def {name} (x):\n    """Return the value of {name}.\n\n    Parameters:\n\n    x -- the input\n    """\n{body}', 4),
+}
+
+
+def parse_mix (text):
+    """Parse a mix of error codes such as "D200=2,D400=1" into a dict from error code to weight.
+
+    :param text: comma separated codes with optional weights, all fixed codes when empty
+    :rtype: dict
+    """
+    if not text:
+        return {code: 1.0 for code in FIXED_CODES}
+    mix = {}
+    for item in text.split (","):
+        code, _, weight = item.partition ("=")
+        if code not in TEMPLATES:
+            raise ValueError (f"no template for {code}")
+        mix[code] = float (weight or 1)
+    return mix
+
+def generate_module (rng, lines, density, mix):
+    """Return the source of a synthetic module.
+
+    :param rng: the random.Random that makes the module reproducible
+    :param lines: the approximate number of lines of the module
+    :param density: the number of docstrings with a violation per 100 lines
+    :param mix: a dict from error code to the weight of its docstrings
+    :rtype: str
+    """
+    codes = list (mix)
+    weights = [mix[code] for code in codes]
+    filler = max (1, round (100 / density) - 4)
+    parts = ['"""A synthetic module generated by auto_bench."""\n\n']
+    count = 2
+    i = 0
+    while count < lines:
+        code = rng.choices (codes, weights)[0]
+        template, indent = TEMPLATES[code]
+        body = "".join (f"{' ' * indent}y{j} = x + {rng.randint (0, 99)}\n" for j in range (filler))
+        body += f"{' ' * indent}return x\n"
+        part = template.format (name=f"func_{i}", body=body) + "\n\n"
+        parts.append (part)
+        count += part.count ("\n")
+        i += 1
+    return "".join (parts)
+
+def generate_corpus (files=50, lines=400, density=10, mix=None, seed=0):
+    """Return a reproducible synthetic corpus.
+
+    :param files: the number of modules
+    :param lines: the approximate number of lines of each module
+    :param density: the number of docstrings with a violation per 100 lines
+    :param mix: a dict from error code to the weight of its docstrings, all fixed codes when None
+    :param seed: the seed of the random generator
+    :return: a dict from the relative file name to the source of each module
+    :rtype: dict
+    """
+    rng = random.Random (seed)
+    mix = mix or parse_mix ("")
+    return {f"module_{i:04d}.py": generate_module (rng, lines, density, mix) for i in range (files)}
+
+def write_corpus (corpus, path):
+    """Write the modules of a corpus under path and return their file names in order."""
+    fnames = []
+    for name in sorted (corpus):
+        fname = os.path.join (path, name)
+        with open (fname, "w") as f:
+            f.write (corpus[name])
+        fnames.append (fname)
+    return fnames
+
+def run_once (fnames, checker):
+    """Check and fix the files once and return the runtime of each phase and each fixer.
+
+    :param fnames: the files of a freshly written corpus
+    :param checker: the Checker used to find violations
+    :rtype: dict
+    """
+    timings = defaultdict (float)
+    fixer_timings = defaultdict (float)
+    violations = 0
+    for fname in fnames:
+        start = time.perf_counter ()
+        error_pairs = checker.error_pairs (fname)
+        timings["check"] += time.perf_counter () - start
+        violations += sum (len (lines) for lines in error_pairs.values ())
+        stats = FileStats (fname)
+        obj = AutoDoc (fname, error_pairs, checker, stats)
+        start = time.perf_counter ()
+        contents = obj.read_lines ()
+        timings["read"] += time.perf_counter () - start
+        start = time.perf_counter ()
+        obj.load (contents)
+        timings["index"] += time.perf_counter () - start
+        start = time.perf_counter ()
+        obj.apply_fixes ()
+        timings["fix"] += time.perf_counter () - start
+        start = time.perf_counter ()
+        obj.write ()
+        timings["write"] += time.perf_counter () - start
+        for code, counters in stats.fixers.items ():
+            fixer_timings[code] += counters["seconds"]
+    return {"phases": dict (timings), "fixers": dict (fixer_timings), "violations": violations}
+
+def benchmark (corpus, checker, repeat=3):
+    """Benchmark a corpus and keep the fastest runtime of each phase and fixer over repeat runs.
+
+    :param corpus: a dict from the relative file name to the source of each module
+    :param checker: the Checker used to find violations
+    :param repeat: the number of runs, the corpus is written again before each run
+    :rtype: dict
+    """
+    best = None
+    with tempfile.TemporaryDirectory () as path:
+        for _ in range (repeat):
+            result = run_once (write_corpus (corpus, path), checker)
+            if best is None:
+                best = result
+                continue
+            for key in ("phases", "fixers"):
+                for name, seconds in result[key].items ():
+                    best[key][name] = min (best[key][name], seconds)
+    best["files"] = len (corpus)
+    best["lines"] = sum (source.count ("\n") for source in corpus.values ())
+    return best
+
+def print_report (result):
+    """Print the runtime and the throughput of each phase and the runtime of each fixer."""
+    files, lines = result["files"], result["lines"]
+    print (f"{files} files, {lines} lines, {result['violations']} violations\n")
+    print (f"{'phase':<8}{'seconds':>12}{'files/s':>12}{'lines/s':>14}")
+    total = 0
+    for phase in PHASES + ["total"]:
+        seconds = total if phase == "total" else result["phases"].get (phase, 0)
+        total += seconds
+        print (f"{phase:<8}{seconds:>12.4f}{files / max (seconds, 1e-9):>12.0f}{lines / max (seconds, 1e-9):>14.0f}")
+    print (f"\n{'fixer':<8}{'seconds':>12}")
+    for code, seconds in sorted (result["fixers"].items ()):
+        print (f"{code:<8}{seconds:>12.4f}")
+
+def time_command (args, source):
+    """Return the runtime of a command that reads source from stdin."""
+    start = time.perf_counter ()
+    subprocess.run (args, input=source, stdout=subprocess.DEVNULL, text=True, check=True)
+    return time.perf_counter () - start
+
+def latency (corpus, native=False):
+    """Return the latency of fixing each module of a corpus as a buffer, cold and through auto_server.
+
+    A server is started on a temporary socket for the run. Every module is sent once so the
+    server never answers from its memo.
+
+    :param corpus: a dict from the relative file name to the source of each module
+    :param native: detect violations without pydocstyle
+    :return: a dict from the mode to the latency of each request in seconds, the modes are a
+             cold auto_doc.py run, an auto_client.py run and a request from this process
+    :rtype: dict
+    """
+    here = os.path.dirname (os.path.abspath (__file__))
+    flags = ["--native"] if native else []
+    sources = [corpus[name] for name in sorted (corpus)]
+    results = {}
+    with tempfile.TemporaryDirectory () as path:
+        socket_file = os.path.join (path, "bench.sock")
+        server = subprocess.Popen ([sys.executable, os.path.join (here, "auto_server.py"), "--socket", socket_file, *flags])
+        try:
+            deadline = time.time () + 30
+            while not os.path.exists (socket_file):
+                if time.time () > deadline or server.poll () is not None:
+                    raise RuntimeError ("auto_server did not start")
+                time.sleep (0.01)
+            cold = [sys.executable, os.path.join (here, "auto_doc.py"), *flags, "-"]
+            results["cold"] = [time_command (cold, source) for source in sources]
+            # the server answers the same source from its memo, so each mode sends modified sources
+            client = [sys.executable, os.path.join (here, "auto_client.py"), "--socket", socket_file, "-"]
+            results["client"] = [time_command (client, source + "\n") for source in sources]
+            results["request"] = []
+            for source in sources:
+                start = time.perf_counter ()
+                auto_client.fix_source (source + "\n\n", socket_file)
+                results["request"].append (time.perf_counter () - start)
+        finally:
+            if server.poll () is None:
+                auto_client.send_request ({"command": "shutdown"}, socket_file)
+                server.wait (30)
+    return results
+
+def print_latency (results):
+    """Print the mean and the percentiles of the latency of each mode in milliseconds."""
+    print (f"{'mode':<8}{'requests':>10}{'mean ms':>10}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}")
+    for mode, values in results.items ():
+        print (f"{mode:<8}{len (values):>10}{1000 * sum (values) / len (values):>10.1f}" +
+               "".join (f"{1000 * percentile (values, p):>10.1f}" for p in (50, 90, 100)))
+
+def compare (result, baseline, threshold=0.1, min_seconds=0.001):
+    """Return the phases and fixers that got slower than in the baseline.
+
+    :param result: the result of benchmark
+    :param baseline: a result of benchmark saved earlier
+    :param threshold: the allowed relative slowdown
+    :param min_seconds: slowdowns smaller than this are noise
+    :return: tuples of the name, the baseline runtime and the new runtime
+    :rtype: list
+    """
+    regressions = []
+    for key in ("phases", "fixers"):
+        for name, old in baseline[key].items ():
+            new = result[key].get (name, 0)
+            if new > old * (1 + threshold) and new - old > min_seconds:
+                regressions.append ((name, old, new))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser (description=__doc__)
+    parser.add_argument ("--files", type=int, default=50, help="number of modules")
+    parser.add_argument ("--lines", type=int, default=400, help="approximate lines per module")
+    parser.add_argument ("--density", type=float, default=10, help="docstrings with a violation per 100 lines")
+    parser.add_argument ("--mix", default="", help="error codes and weights, e.g. D200=2,D400=1")
+    parser.add_argument ("--seed", type=int, default=0, help="seed of the synthetic corpus")
+    parser.add_argument ("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept")
+    parser.add_argument ("--native", action="store_true", help="detect violations without pydocstyle")
+    parser.add_argument ("--latency", type=int, metavar="N",
+                         help="compare the latency of N cold runs with requests to auto_server instead")
+    parser.add_argument ("--save", help="write the results to this baseline file")
+    parser.add_argument ("--compare", help="flag regressions against this baseline file")
+    parser.add_argument ("--threshold", type=float, default=0.1, help="allowed relative slowdown")
+    args = parser.parse_args ()
+
+    if args.latency:
+        print_latency (latency (generate_corpus (args.latency, args.lines, args.density, parse_mix (args.mix), args.seed),
+                                args.native))
+        sys.exit (0)
+    settings = {key: getattr (args, key) for key in ("files", "lines", "density", "mix", "seed", "native")}
+    corpus = generate_corpus (args.files, args.lines, args.density, parse_mix (args.mix), args.seed)
+    result = benchmark (corpus, Checker (ignore=IGNORED_CODES, convention="pep257", native=args.native), args.repeat)
+    result["settings"] = settings
+    print_report (result)
+    if args.save:
+        with open (args.save, "w") as f:
+            json.dump (result, f, indent=2)
+    if args.compare:
+        with open (args.compare, "r") as f:
+            baseline = json.load (f)
+        if baseline.get ("settings") != settings:
+            print (f"\nWARNING: the baseline was run with {baseline.get ('settings')}")
+        regressions = compare (result, baseline, args.threshold)
+        print ()
+        for name, old, new in regressions:
+            print (f"REGRESSION {name}: {old:.4f} -> {new:.4f} seconds ({new / old - 1:+.0%})")
+        if not regressions:
+            print ("No regressions")
+        sys.exit (1 if regressions else 0)
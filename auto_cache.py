@@ -0,0 +1,87 @@
+"""A persistent cache of checker results keyed by file contents."""
+
+import os
+import json
+import hashlib
+from collections import OrderedDict, defaultdict
+
+# default location of the cache file
+CACHE_FILE = ".autodoc_cache.json"
+
+
+class ResultCache (object):
+    """Remember the violations of file contents across runs.
+
+    Entries are keyed by a hash of the checker settings and the file contents and record the
+    error pairs of the contents, an empty dict meaning the file is clean, and whether auto_doc
+    has nothing left to change in them. The least recently used entries are evicted when the
+    cache holds more than max_entries.
+    """
+
+    def __init__ (self, fname=CACHE_FILE, settings="", max_entries=100000):
+        """Load the cache file.
+
+        :param fname: the cache file, created on save when it does not exist
+        :param settings: a description of the checker, entries of other settings are never hit
+        :param max_entries: the number of entries kept when saving
+        """
+        self.fname = fname
+        self.settings = settings
+        self.max_entries = max_entries
+        self.entries = OrderedDict ()
+        self.keys = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open (fname, "r") as f:
+                self.entries = json.load (f, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError):
+            # a missing or corrupt cache is rebuilt from scratch
+            pass
+
+    def file_key (self, fname):
+        """Return the cache key of a file's current contents and remember it for fname."""
+        with open (fname, "rb") as f:
+            contents = f.read ()
+        key = hashlib.sha1 (self.settings.encode ("utf-8") + b"\0" + contents).hexdigest ()
+        self.keys[fname] = key
+        return key
+
+    def get (self, fname):
+        """Return the cached error pairs of a file, or None when its contents were never checked."""
+        entry = self.entries.get (self.file_key (fname))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end (self.keys[fname])
+        error_pairs = defaultdict (list)
+        error_pairs.update (entry["pairs"])
+        return error_pairs
+
+    def put (self, fname, error_pairs):
+        """Record the error pairs of the contents of fname last seen by get."""
+        key = self.keys[fname]
+        if key not in self.entries:
+            self.entries[key] = {"pairs": dict (error_pairs), "fixed": False}
+        self.entries.move_to_end (key)
+
+    def is_fixed (self, fname):
+        """Return True when auto_doc is known to leave the contents of fname unchanged."""
+        entry = self.entries.get (self.keys.get (fname))
+        return entry is not None and entry["fixed"]
+
+    def mark_fixed (self, fname):
+        """Record that auto_doc left the contents of fname unchanged."""
+        entry = self.entries.get (self.keys.get (fname))
+        if entry is not None:
+            entry["fixed"] = True
+
+    def save (self):
+        """Evict the least recently used entries and write the cache file."""
+        while len (self.entries) > self.max_entries:
+            self.entries.popitem (last=False)
+        temp_fname = self.fname + ".tmp"
+        with open (temp_fname, "w") as f:
+            json.dump (self.entries, f)
+        os.replace (temp_fname, self.fname)
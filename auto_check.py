@@ -0,0 +1,427 @@
+"""Checker backends that report PEP 257 violations for auto_doc."""
+
+import os
+import re
+import sys
+import hashlib
+import subprocess
+import tempfile
+import tokenize
+from collections import defaultdict, namedtuple
+
+try:
+    from pydocstyle import ConventionChecker, conventions, __version__
+    from pydocstyle.config import ConfigurationParser
+    from pydocstyle.parser import AllError, ParseError
+except ImportError:
+    ConventionChecker = None
+
+from auto_detect import FIXED_CODES, detect_source
+
+# a single violation reported by a checker
+Violation = namedtuple ("Violation", ["fname", "line", "code"])
+
+# missing docstrings and docstring mood issues are not fixed by auto_doc
+IGNORED_CODES = ["D100", "D101", "D102", "D103", "D104", "D105", "D106", "D107", "D401", "D402"]
+
+# same defaults pydocstyle uses when walking a directory, used when pydocstyle cannot be imported
+MATCH_RE = re.compile (r"(?!test_).*\.py$")
+MATCH_DIR_RE = re.compile (r"[^\.].*$")
+
+# the configuration files pydocstyle reads in each directory
+CONFIG_FILES = ("setup.cfg", "tox.ini", ".pydocstyle", ".pydocstyle.ini", ".pydocstylerc", ".pydocstylerc.ini",
+                "pyproject.toml", ".pep257")
+
+# header line of a violation in pydocstyle's output, e.g. "foo.py:12 in public function `bar`:"
+HEADER_RE = re.compile (r"^(.*):(\d+)\s")
+
+
+def parse_configuration (args):
+    """Return a pydocstyle ConfigurationParser that parsed a command line of the pydocstyle command.
+
+    Its get_files_to_check walks the paths of args and finds the configuration of each file
+    (setup.cfg, tox.ini, .pydocstyle, ...) the same way the command does.
+
+    :param args: the arguments of the pydocstyle command, with at least one path
+    """
+    conf = ConfigurationParser ()
+    # the parser reads the command line from sys.argv like the command
+    argv = sys.argv
+    sys.argv = ["pydocstyle", *args]
+    try:
+        conf.parse ()
+    finally:
+        sys.argv = argv
+    return conf
+
+
+def iter_files (path):
+    """Yield the python files pydocstyle would check for the given path.
+
+    With pydocstyle's Python API the files come in the order the pydocstyle command walks them and
+    the match and match_dir options of the configuration files are honoured. Otherwise pydocstyle's
+    defaults are used and the files come in sorted order.
+
+    :param path: a file or a directory
+    """
+    if ConventionChecker is not None:
+        for fname, *_ in parse_configuration ([path]).get_files_to_check ():
+            yield fname
+        return
+    if not os.path.isdir (path):
+        yield path
+        return
+    for root, dirs, files in os.walk (path):
+        dirs[:] = sorted (d for d in dirs if MATCH_DIR_RE.match (d))
+        for fname in sorted (files):
+            if MATCH_RE.match (fname):
+                yield os.path.join (root, fname)
+
+
+def collect_files (path):
+    """Return the python files pydocstyle would check for the given path.
+
+    :param path: a file or a directory
+    :return: sorted file names
+    :rtype: list
+    """
+    return sorted (iter_files (path))
+
+
+def filter_files (fnames):
+    """Return the files of fnames whose names match the match option of their configuration.
+
+    :param fnames: file names
+    :rtype: list
+    """
+    if ConventionChecker is None:
+        return [fname for fname in fnames if MATCH_RE.match (os.path.basename (fname))]
+    if not fnames:
+        return []
+    return [fname for fname, *_ in parse_configuration (fnames).get_files_to_check ()]
+
+
+def config_digest (path):
+    """Return a hash of the pydocstyle configuration files that can apply to the files under path.
+
+    These are the configuration files of path, of its parent directories and of the directories
+    under path.
+
+    :param path: a file or a directory
+    :return: a hex digest, None when there are no configuration files
+    """
+    path = os.path.abspath (path)
+    directory = path if os.path.isdir (path) else os.path.dirname (path)
+    directories = []
+    parent = os.path.dirname (directory)
+    while parent != directory:
+        directories.append (directory)
+        directory, parent = parent, os.path.dirname (parent)
+    directories.append (directory)
+    if os.path.isdir (path):
+        directories.extend (root for root, _, _ in os.walk (path) if root != path)
+    digest = hashlib.sha1 ()
+    found = False
+    for directory in directories:
+        for name in CONFIG_FILES:
+            fname = os.path.join (directory, name)
+            if os.path.isfile (fname):
+                found = True
+                digest.update (fname.encode ("utf-8") + b"\0")
+                with open (fname, "rb") as f:
+                    digest.update (f.read () + b"\0")
+    return digest.hexdigest () if found else None
+
+
+def git_changed_files (path, base=None, staged=False):
+    """Return the python files under path that git reports as changed, in sorted order.
+
+    Only files that still exist and that pydocstyle would check for path are returned.
+
+    :param path: a file or a directory inside a git repository
+    :param base: a ref, the files changed since its merge base with HEAD are returned,
+                 including uncommitted changes, HEAD when None
+    :param staged: return the files staged for commit instead
+    :rtype: list
+    """
+    root = path if os.path.isdir (path) else os.path.dirname (os.path.abspath (path))
+
+    def git (*args):
+        process = subprocess.run (["git", *args], cwd=root, stdout=subprocess.PIPE, check=True, text=True)
+        return process.stdout
+
+    toplevel = git ("rev-parse", "--show-toplevel").strip ()
+    if staged:
+        args = ["--cached"]
+    else:
+        args = [git ("merge-base", base or "HEAD", "HEAD").strip ()]
+    names = git ("diff", "--name-only", "-z", "--diff-filter=ACMR", *args).split ("\0")
+    abspath = os.path.realpath (path)
+    fnames = []
+    for name in names:
+        fname = os.path.join (toplevel, name)
+        if not name or not os.path.isfile (fname):
+            continue
+        if not os.path.isdir (path):
+            if os.path.samefile (fname, abspath):
+                fnames.append (path)
+            continue
+        relpath = os.path.relpath (fname, abspath)
+        parts = relpath.split (os.sep)
+        if parts[0] == os.pardir:
+            continue
+        if all (MATCH_DIR_RE.match (part) for part in parts[:-1]):
+            fnames.append (os.path.join (path, relpath))
+    return sorted (filter_files (fnames))
+
+
+def shard_files (fnames, root, index, count):
+    """Return the files that belong to one shard of a partition of fnames.
+
+    A file is assigned by a hash of its path relative to root, so every machine computes the
+    same partition wherever the tree is checked out.
+
+    :param fnames: file names under root
+    :param root: the directory the paths are hashed relative to
+    :param index: the shard, from 1 to count
+    :param count: the number of shards
+    :rtype: list
+    """
+    shard = []
+    for fname in fnames:
+        relpath = os.path.relpath (fname, root).replace (os.sep, "/")
+        if int (hashlib.sha1 (relpath.encode ("utf-8")).hexdigest (), 16) % count == index - 1:
+            shard.append (fname)
+    return shard
+
+
+def group_violations (violations):
+    """Group violations into error dicts.
+
+    :param violations: an iterable of Violation
+    :return: a dict from file name to a dict from error code to a list of line numbers
+    :rtype: dict
+    """
+    error_dict = defaultdict (dict)
+    for violation in violations:
+        if violation.fname not in error_dict:
+            error_dict[violation.fname] = defaultdict (list)
+        error_dict[violation.fname][violation.code].append (violation.line)
+    return error_dict
+
+
+def group_by_file (violations):
+    """Yield the file name and error pairs of each run of violations that belong to the same file.
+
+    :param violations: an iterable of Violation where the violations of a file are consecutive
+    """
+    fname = None
+    error_pairs = None
+    for violation in violations:
+        if violation.fname != fname:
+            if fname is not None:
+                yield fname, error_pairs
+            fname = violation.fname
+            error_pairs = defaultdict (list)
+        error_pairs[violation.code].append (violation.line)
+    if fname is not None:
+        yield fname, error_pairs
+
+
+def parse_output (lines):
+    """Parse lines of the stdout of the pydocstyle command line into violations.
+
+    Every violation takes two lines: a header with the file name and the line number,
+    followed by the error code and its message.
+    """
+    lines = iter (lines)
+    for line in lines:
+        match = HEADER_RE.match (line.strip ())
+        if match:
+            code = next (lines, "").strip ()[:4]
+            yield Violation (match.group (1), int (match.group (2)), code)
+
+
+class Checker (object):
+    """Report PEP 257 violations with pydocstyle.
+
+    pydocstyle's Python API is used in-process when it can be imported, so the
+    interpreter and pydocstyle are only loaded once. Running the pydocstyle
+    command in a subprocess is kept as a fallback. With native, the detector
+    of auto_detect reports the violations auto_doc fixes without pydocstyle.
+    """
+
+    def __init__ (self, ignore=None, convention=None, native=False):
+        """Initialize the error codes to check.
+
+        The codes, the ignored decorators and the files to check come from the pydocstyle
+        configuration of each file (setup.cfg, tox.ini, .pydocstyle, ...) like with the pydocstyle
+        command, convention and ignore override it like its --convention and --add-ignore options.
+
+        :param ignore: error codes to ignore on top of the convention
+        :param convention: the pydocstyle convention to check against, the configured one when None
+        :param native: detect the error codes auto_doc fixes with auto_detect
+        """
+        self.ignore = list (ignore or [])
+        self.convention = convention
+        self.native = native
+        self.checker = None
+        if ConventionChecker is not None:
+            self.checker = ConventionChecker ()
+            # the codes of source code that is not checked from a file
+            self.codes = set (getattr (conventions, convention or "pep257")) - set (self.ignore)
+        if native:
+            self.codes = set (FIXED_CODES) - set (self.ignore)
+            if ConventionChecker is not None:
+                self.codes &= set (getattr (conventions, convention or "pep257"))
+        # violations are found in this process rather than by the pydocstyle command
+        self.in_process = native or self.checker is not None
+
+    def settings (self, path=None):
+        """Return a description of the pydocstyle version and options used by the checker.
+
+        :param path: the file or directory that is checked, its configuration files are included
+        """
+        if self.native:
+            version = "native " + ",".join (sorted (self.codes))
+        elif self.checker is not None:
+            version = __version__
+        else:
+            process = subprocess.run (["pydocstyle", "--version"], stdout=subprocess.PIPE)
+            version = process.stdout.decode ("utf-8").strip ()
+        settings = f"pydocstyle {version} {' '.join (self.command ([])[1:])}"
+        digest = config_digest (path) if path is not None else None
+        if digest is not None:
+            settings += f" config={digest}"
+        return settings
+
+    def check_source (self, source, fname, config=None):
+        """Return the violations of the given source code.
+
+        :param source: the contents of a python file
+        :param fname: the file name reported with the violations
+        :param config: the checked codes, ignored decorators, property decorators and
+                       ignore_self_only_init pydocstyle's configuration gives the file, the codes
+                       of the checker when None
+        :rtype: list
+        """
+        if config is None:
+            codes, ignore_decorators, property_decorators, ignore_self_only_init = self.codes, None, None, False
+        else:
+            codes, ignore_decorators, property_decorators, ignore_self_only_init = config
+            codes = set (codes) - set (self.ignore)
+            if self.native:
+                codes &= set (FIXED_CODES)
+        if self.native:
+            return [Violation (fname, line, code) for line, code in detect_source (source, fname, codes)]
+        violations = []
+        try:
+            for error in self.checker.check_source (source, fname, ignore_decorators, property_decorators,
+                                                    ignore_self_only_init=ignore_self_only_init):
+                code = getattr (error, "code", None)
+                if code in codes:
+                    violations.append (Violation (fname, error.line, code))
+        except (ParseError, AllError, tokenize.TokenError) as e:
+            # like the pydocstyle command, report the error and keep what was found before it
+            print (f"WARNING: Error in file {fname}: {e}", file=sys.stderr)
+        return violations
+
+    def configured_files (self, paths):
+        """Yield each python file pydocstyle would check for paths with the configuration of the file.
+
+        Without pydocstyle's Python API the configuration is None and the files of iter_files are yielded.
+
+        :param paths: files and directories
+        :return: pairs of the file name and the configuration check_source takes
+        """
+        if ConventionChecker is None:
+            for path in paths:
+                for fname in iter_files (path):
+                    yield fname, None
+            return
+        if not paths:
+            return
+        for fname, *config in parse_configuration (self.command (paths)[1:]).get_files_to_check ():
+            yield fname, config
+
+    def check_file (self, fname, config=None):
+        """Return the violations of a file, none when it cannot be read, see check_source."""
+        try:
+            with tokenize.open (fname) as f:
+                source = f.read ()
+        except (OSError, SyntaxError):
+            return []
+        return self.check_source (source, fname, config)
+
+    def check_files (self, fnames):
+        """Yield the violations of the given files in order.
+
+        Like with the pydocstyle command, the files that do not match the match option of their
+        configuration are skipped.
+        """
+        fnames = list (fnames)
+        if not self.in_process:
+            yield from self.run_subprocess (fnames)
+            return
+        for fname, config in self.configured_files (fnames):
+            yield from self.check_file (fname, config)
+
+    def command (self, paths):
+        """Return the pydocstyle command line that checks the given paths."""
+        args = ["pydocstyle", *paths]
+        if self.convention is not None:
+            args.append (f"--convention={self.convention}")
+        if self.ignore:
+            args.append (f"--add-ignore={','.join (self.ignore)}")
+        return args
+
+    def run_subprocess (self, paths):
+        """Run the pydocstyle command on the given paths and parse its output."""
+        if not paths:
+            return []
+        process = subprocess.run (self.command (paths), stdout=subprocess.PIPE)
+        return list (parse_output (process.stdout.decode ("utf-8").split ("\n")))
+
+    def stream (self, path):
+        """Yield the file name and error pairs of each file under path as soon as it is checked.
+
+        Without pydocstyle's Python API or the native detector, the output of the pydocstyle command is parsed while
+        the command runs and only the files that have violations are yielded.
+        """
+        if self.in_process:
+            for fname, config in self.configured_files ([path]):
+                error_pairs = defaultdict (list)
+                for violation in self.check_file (fname, config):
+                    error_pairs[violation.code].append (violation.line)
+                yield fname, error_pairs
+            return
+        with subprocess.Popen (self.command ([path]), stdout=subprocess.PIPE, text=True) as process:
+            yield from group_by_file (parse_output (process.stdout))
+
+    def source_error_pairs (self, source, fname="<string>"):
+        """Return a dict from the error code to a list of line numbers for source code.
+
+        Without pydocstyle's Python API or the native detector, source is checked from a temporary file.
+        """
+        if not self.in_process:
+            with tempfile.NamedTemporaryFile ("w", suffix=".py") as f:
+                f.write (source)
+                f.flush ()
+                return self.error_pairs (f.name)
+        error_pairs = defaultdict (list)
+        for violation in self.check_source (source, fname):
+            error_pairs[violation.code].append (violation.line)
+        return error_pairs
+
+    def error_pairs (self, fname):
+        """Return a dict from the error code to a list of line numbers for a file."""
+        error_pairs = defaultdict (list)
+        for violation in self.check_files ([fname]):
+            error_pairs[violation.code].append (violation.line)
+        return error_pairs
+
+    def error_dict (self, path):
+        """Return the error pairs of every python file under path that has violations."""
+        if not self.in_process:
+            return group_violations (self.run_subprocess ([path]))
+        return group_violations (self.check_files (collect_files (path)))
@@ -0,0 +1,114 @@
+"""A thin client of auto_server.
+
+Only the standard library is imported so a request costs the interpreter startup and a round trip
+on the socket, the checker and auto_doc stay loaded in the server.
+"""
+
+import os
+import sys
+import json
+import stat
+import socket
+import struct
+import argparse
+
+# name of the server socket in the private directory of socket_dir
+SOCKET_NAME = "autodoc.sock"
+
+
+def check_private (path):
+    """Raise OSError unless path is a directory of the current user that no one else can access."""
+    st = os.lstat (path)
+    if not stat.S_ISDIR (st.st_mode) or st.st_uid != os.getuid () or st.st_mode & 0o077:
+        raise OSError (f"{path} is not a directory only the current user can access")
+
+def socket_dir ():
+    """Return the directory of the default server socket, created when it does not exist.
+
+    It is $XDG_RUNTIME_DIR, which only the current user can access, otherwise a directory with
+    mode 0700 in the temporary directory, which is checked before it is trusted.
+
+    :raises OSError: when the directory cannot be created or other users can access it
+    """
+    runtime_dir = os.environ.get ("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir (runtime_dir):
+        path = os.path.join (runtime_dir, "autodoc")
+    else:
+        path = os.path.join (os.environ.get ("TMPDIR", "/tmp"), f"autodoc-{os.getuid ()}")
+    try:
+        os.mkdir (path, 0o700)
+    except FileExistsError:
+        pass
+    check_private (path)
+    return path
+
+def default_socket ():
+    """Return the default server socket, one per user."""
+    return os.path.join (socket_dir (), SOCKET_NAME)
+
+def peer_uid (sock):
+    """Return the user id of the process at the other end of a connected Unix socket.
+
+    The credentials of the peer are used where SO_PEERCRED exists, elsewhere the owner of the
+    socket file.
+    """
+    if hasattr (socket, "SO_PEERCRED"):
+        creds = sock.getsockopt (socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize ("3i"))
+        return struct.unpack ("3i", creds)[1]
+    path = sock.getpeername () or sock.getsockname ()
+    return os.stat (path).st_uid
+
+def send_request (request, path=None):
+    """Send a request to the server and return its response.
+
+    Requests and responses are JSON objects written on a single line. Only a server run by the
+    current user is trusted.
+
+    :param request: a dict with the command and its arguments
+    :param path: the server socket, default_socket when None
+    :raises OSError: when the server cannot be reached or runs as another user
+    :rtype: dict
+    """
+    path = path or default_socket ()
+    with socket.socket (socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect (path)
+        if peer_uid (sock) != os.getuid ():
+            raise OSError (f"the server at {path} runs as another user")
+        sock.sendall (json.dumps (request).encode ("utf-8") + b"\n")
+        with sock.makefile ("rb") as f:
+            response = json.loads (f.readline () or b"{}")
+    if "error" in response:
+        raise RuntimeError (response["error"])
+    return response
+
+def fix_source (source, path=None):
+    """Return source with its violations fixed by the server."""
+    return send_request ({"command": "fix_source", "source": source}, path)["source"]
+
+def fix_file (fname, path=None):
+    """Let the server fix a file in place and return whether it changed."""
+    return send_request ({"command": "fix_file", "file": os.path.abspath (fname)}, path)["changed"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser (description=__doc__)
+    parser.add_argument ("files", nargs="*", help="files to fix in place, - fixes stdin to stdout")
+    parser.add_argument ("--socket", help="the server socket, in $XDG_RUNTIME_DIR or a private temporary directory by default")
+    parser.add_argument ("--shutdown", action="store_true", help="stop the server")
+    args = parser.parse_args ()
+    try:
+        args.socket = args.socket or default_socket ()
+    except OSError as e:
+        sys.exit (f"ERROR: {e}")
+    try:
+        if args.shutdown:
+            send_request ({"command": "shutdown"}, args.socket)
+        for fname in args.files:
+            if fname == "-":
+                sys.stdout.write (fix_source (sys.stdin.read (), args.socket))
+            else:
+                fix_file (fname, args.socket)
+    except OSError as e:
+        sys.exit (f"ERROR: cannot reach the server at {args.socket}: {e}")
+    except RuntimeError as e:
+        sys.exit (f"ERROR: {e}")
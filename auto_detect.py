@@ -0,0 +1,298 @@
+"""A native detector for the PEP 257 violations auto_doc fixes.
+
+Only the error codes in FIXED_CODES are detected, following pydocstyle's rules for them,
+so the rest of pydocstyle's rule set is never run on the hot path.
+
+Known deviations from pydocstyle: a docstring is a string that makes up a whole statement,
+while pydocstyle takes the first string token of a body even when the statement goes on.
+So nothing is reported for
+
+- an implicitly concatenated string such as "Summary." "" (pydocstyle checks "Summary."
+  alone and reports D300),
+- a string expression such as 'text'.lower () (pydocstyle reports D300, and D301 when the
+  string has a backslash, where adding r would change the value of the string).
+
+Running this module as a script compares the detector with pydocstyle, these cases show up
+as mismatches.
+"""
+
+import io
+import os
+import re
+import sys
+import ast
+import string
+import tokenize
+from collections import defaultdict
+
+from auto_helper import iter_docstrings
+
+# error codes auto_doc has a fixer for
+FIXED_CODES = ["D200", "D202", "D204", "D205", "D210", "D300", "D301", "D400", "D403", "D412"]
+
+# section names of numpy and google style docstrings, same as pydocstyle's
+NUMPY_SECTION_NAMES = ["Short Summary", "Extended Summary", "Parameters", "Returns", "Yields",
+                       "Other Parameters", "Raises", "See Also", "Notes", "References", "Examples",
+                       "Attributes", "Methods"]
+GOOGLE_SECTION_NAMES = ["Args", "Arguments", "Attention", "Attributes", "Caution", "Danger", "Error",
+                        "Example", "Examples", "Hint", "Important", "Keyword Args", "Keyword Arguments",
+                        "Methods", "Note", "Notes", "Return", "Returns", "Raises", "References",
+                        "See Also", "Tip", "Todo", "Warning", "Warnings", "Warns", "Yield", "Yields"]
+
+DOUBLE_QUOTES_RE = re.compile (r'[uU]?[rR]?"""[^"].*')
+SINGLE_QUOTES_RE = re.compile (r"[uU]?[rR]?'''[^'].*")
+BACKSLASH_RE = re.compile (r"\\[^\nuN]")
+NESTED_DEFINITION_RE = re.compile (r"\s+(?:(?:class|def|async def)\s|@)")
+LEADING_WORDS_RE = re.compile (r"[\w ]+")
+SECTION_PUNCTUATION = (",", ";", ".", "-", "\\", "/", "]", "}", ")")
+
+
+# detectors in the order they are run on a docstring
+DETECTORS = {}
+
+def detector (code, kinds=("module", "class", "def")):
+    """Register a function as the detector of an error code.
+
+    A detector takes the lines of the file and a Definition and returns the number of
+    violations of its error code in the docstring of the definition.
+
+    :param code: the error code
+    :param kinds: the kinds of definitions the error code applies to
+    """
+    def register (func):
+        DETECTORS[code] = (func, kinds)
+        return func
+    return register
+
+
+class Definition (object):
+    """The docstring of a module, class or function as seen by the detectors."""
+
+    def __init__ (self, kind, token, followed):
+        """Initialize the definition from the STRING token of its docstring.
+
+        :param kind: "module", "class" or "def"
+        :param token: the STRING token of the docstring
+        :param followed: whether code follows the docstring in the body of the definition
+        """
+        self.kind = kind
+        self.token = token
+        self.raw = token.string
+        self.value = ast.literal_eval (token.string)
+        self.followed = followed
+
+
+def is_blank (line):
+    """Return True when line only contains whitespaces."""
+    return not line.strip ()
+
+def count_leading_blanks (lines):
+    """Return the number of blank lines at the start of lines."""
+    count = 0
+    for line in lines:
+        if not is_blank (line):
+            break
+        count += 1
+    return count
+
+@detector ("D200")
+def detect_D200 (contents, definition):
+    """Detects D200: One-line docstring should fit on one line with quotes."""
+    lines = definition.value.split ("\n")
+    return len (lines) > 1 and sum (1 for line in lines if not is_blank (line)) == 1
+
+@detector ("D202", kinds=("def",))
+def detect_D202 (contents, definition):
+    """Detects D202: No blank lines allowed after function docstring.
+
+    One blank line is allowed when it is followed by an inner function or class.
+    """
+    if not definition.followed:
+        return False
+    end_row, end_col = definition.token.end
+    count = count_leading_blanks (contents[end_row:])
+    if count == 0:
+        return False
+    after = contents[end_row-1][end_col:] + "".join (contents[end_row:end_row+count+1])
+    return not (count == 1 and NESTED_DEFINITION_RE.match (after))
+
+@detector ("D204", kinds=("class",))
+def detect_D204 (contents, definition):
+    """Detects D204: 1 blank line required after class docstring."""
+    return definition.followed and count_leading_blanks (contents[definition.token.end[0]:]) != 1
+
+@detector ("D205")
+def detect_D205 (contents, definition):
+    """Detects D205: 1 blank line required between summary line and description."""
+    lines = definition.value.strip ().split ("\n")
+    return len (lines) > 1 and count_leading_blanks (lines[1:]) != 1
+
+@detector ("D210")
+def detect_D210 (contents, definition):
+    """Detects D210: No whitespaces allowed surrounding docstring text."""
+    lines = definition.value.split ("\n")
+    return lines[0].startswith (" ") or len (lines) == 1 and lines[0].endswith (" ")
+
+@detector ("D300")
+def detect_D300 (contents, definition):
+    """Detects D300: Use triple double quotes, unless the docstring contains them."""
+    regex = SINGLE_QUOTES_RE if '"""' in definition.value else DOUBLE_QUOTES_RE
+    return not regex.match (definition.raw)
+
+@detector ("D301")
+def detect_D301 (contents, definition):
+    """Detects D301: Use r before triple double quotes if any backslashes in a docstring."""
+    return BACKSLASH_RE.search (definition.raw) is not None and not definition.raw.startswith (("r", "ur"))
+
+@detector ("D400")
+def detect_D400 (contents, definition):
+    """Detects D400: First line should end with a period."""
+    return not definition.value.strip ().split ("\n")[0].endswith (".")
+
+@detector ("D403", kinds=("def",))
+def detect_D403 (contents, definition):
+    """Detects D403: First word of the first line should be properly capitalized."""
+    first_word = definition.value.split ()[0]
+    if first_word == first_word.upper ():
+        return False
+    for char in first_word:
+        if char not in string.ascii_letters and char != "'":
+            return False
+    return first_word != first_word.capitalize ()
+
+def get_leading_words (line):
+    """Return the leading words of line, or None when it does not start with a word."""
+    match = LEADING_WORDS_RE.match (line.strip ())
+    if match is not None:
+        return match.group ()
+
+def is_section (name, line, previous_line):
+    """Return True when a line suspected to be a section header really is one.
+
+    The header must have no suffix but a colon and follow a blank line or the end of a sentence.
+    """
+    suffix = line.strip ().lstrip (name.strip ()).strip ()
+    if not is_blank (suffix) and suffix != ":":
+        return False
+    return is_blank (previous_line) or previous_line.strip ().endswith (SECTION_PUNCTUATION)
+
+def find_sections (lines, section_names):
+    """Return the index in lines of each section header of a docstring.
+
+    :param lines: the lines of the raw docstring
+    :param section_names: the section names of a docstring style
+    :rtype: list
+    """
+    lower_names = [name.lower () for name in section_names]
+    return [i for i, line in enumerate (lines)
+            if get_leading_words (line.lower ()) in lower_names
+            and is_section (get_leading_words (line.strip ()), line, lines[i-1])]
+
+def is_section_D412 (following_lines):
+    """Return True when the content of a section is separated from its header by blank lines.
+
+    :param following_lines: the lines of the section after its header
+    """
+    blanks = count_leading_blanks (following_lines)
+    if blanks == len (following_lines):
+        return False
+    if "".join (set (following_lines[blanks].strip ())) != "-":
+        return blanks > 0
+    # the header is underlined, look at the line after the dashes
+    after_dashes = blanks + 1
+    if after_dashes >= len (following_lines) or not is_blank (following_lines[after_dashes]):
+        return False
+    return not is_blank ("".join (following_lines[after_dashes:]))
+
+@detector ("D412")
+def detect_D412 (contents, definition):
+    """Detects D412: No blank lines allowed between a section header and its content.
+
+    Numpy sections are looked for first, google sections only when there are none.
+    """
+    lines = definition.raw.split ("\n")
+    if len (lines) < 2:
+        return 0
+    sections = find_sections (lines, NUMPY_SECTION_NAMES) or find_sections (lines, GOOGLE_SECTION_NAMES)
+    # the last section stops before the last line of the docstring
+    ends = sections[1:] + [len (lines) - 1]
+    return sum (1 for start, end in zip (sections, ends) if is_section_D412 (lines[start+1:end]))
+
+def parse_source (source, fname):
+    """Return the lines of source, or None when it does not compile.
+
+    :param source: the contents of a python file
+    :param fname: the file name reported by syntax errors
+    """
+    try:
+        compile (source, fname, "exec")
+    except (SyntaxError, ValueError):
+        return None
+    # split on newlines only, like reading the file, str.splitlines also splits on form feeds
+    return io.StringIO (source).readlines ()
+
+def detect_source (source, fname="<string>", codes=None, lines=None):
+    """Yield the line number and error code of each violation in source.
+
+    Like pydocstyle, nothing is reported for a file that does not compile, an empty docstring
+    is not checked and a noqa comment before a docstring skips its violations.
+
+    :param source: the contents of a python file
+    :param fname: the file name reported by syntax errors
+    :param codes: the error codes to detect, all of FIXED_CODES when None
+    :param lines: the line numbers where the checked docstrings start, every docstring is
+                  checked when None, otherwise source is assumed to compile
+    """
+    if lines is None:
+        contents = parse_source (source, fname)
+        if contents is None:
+            return
+    else:
+        contents = io.StringIO (source).readlines ()
+    for kind, token, skipped, followed in iter_docstrings (contents):
+        if lines is not None and token.start[0] not in lines:
+            continue
+        if skipped == "all":
+            continue
+        try:
+            definition = Definition (kind, token, followed)
+        except (ValueError, SyntaxError):
+            # pydocstyle stops checking a file at a docstring it cannot evaluate
+            return
+        if is_blank (definition.value):
+            continue
+        if not isinstance (definition.value, str):
+            return
+        for code, (detect, kinds) in DETECTORS.items ():
+            if kind in kinds and (codes is None or code in codes) and code not in skipped:
+                for _ in range (int (detect (contents, definition))):
+                    yield token.start[0], code
+
+def error_pairs (source, fname="<string>", codes=None, lines=None):
+    """Return a dict from the error code to a list of line numbers for source, see detect_source."""
+    pairs = defaultdict (list)
+    for line, code in sorted (detect_source (source, fname, codes, lines)):
+        pairs[code].append (line)
+    return pairs
+
+
+# compare the native detector with pydocstyle on the files under the paths given as arguments
+if __name__ == "__main__":
+    from auto_check import Checker, collect_files
+    reference = Checker (ignore=set (Checker ().codes) - set (FIXED_CODES), convention="pep257")
+    paths = sys.argv[1:] or ["."]
+    fnames = [fname for path in paths for fname in (collect_files (path) if os.path.isdir (path) else [path])]
+    mismatches = 0
+    for fname in fnames:
+        try:
+            with tokenize.open (fname) as f:
+                source = f.read ()
+        except (OSError, SyntaxError):
+            continue
+        expected = {code: sorted (lines) for code, lines in reference.source_error_pairs (source, fname).items ()}
+        found = {code: sorted (lines) for code, lines in error_pairs (source, fname).items ()}
+        if expected != found:
+            mismatches += 1
+            print (f"{fname}:\n    pydocstyle: {expected}\n    native:     {found}")
+    print (f"{len (fnames)} files, {mismatches} mismatches")
+    sys.exit (1 if mismatches else 0)
@@ -1,36 +1,286 @@
 """Automatically fixes PEP 257 violations for documentations."""
 
+import io
 import os
 import sys 
 import time 
-import subprocess
 from collections import defaultdict
 
+from auto_check import Checker
+from auto_detect import error_pairs as detect_error_pairs
+from auto_stats import FileStats, StatsRecorder
 from auto_helper import (
     print_errors, 
-    extract_docstring,
-    adjust_line_num,
-    get_quote_type, 
-    get_first_alpha_index,
+    index_docstrings,
+    EditBuffer,
+    write_atomic,
     first_non_whitespace_index,
     manage_blank_lines
 )
 
 
+# fixers in the order they are applied to a docstring
+FIXERS = {}
+
+def fixer (code): 
+    """Register a function as the fixer of an error code.
+
+    A fixer edits the lines of one docstring region in place and returns the updated Docstring,
+    the lines start with the docstring and are followed by the blank lines after it and the
+    next line of code.
+    """
+    def register (func): 
+        FIXERS[code] = func
+        return func
+    return register
+
+@fixer ("D200")
+def fix_D200 (contents, doc): 
+    """Fixes D200: One-line docstring should fit on one line with quotes.
+
+    This operation will change the line numbers in file. 
+    """ 
+    quote_type = doc.quote
+    raw_docs = "".join (contents[:doc.end+1])
+    quote_len = len (quote_type) 
+    content_start = raw_docs.find (quote_type, doc.column) + quote_len
+    content_end = raw_docs.rfind (quote_type) 
+    result_docs = (raw_docs[:content_start] + raw_docs[content_start:content_end].strip () + 
+                   raw_docs[content_end:]) 
+    # remove original docstring and insert new docstring
+    contents[:doc.end+1] = [result_docs]
+    return doc._replace (end=0, text_line=0)
+
+@fixer ("D202")
+def fix_D202 (contents, doc): 
+    """Fixes D202: No blank lines allowed after function docstring.
+
+    This operation will change the line numbers in file. 
+    """ 
+    manage_blank_lines (contents, doc.end + 1)
+    return doc
+
+@fixer ("D204")
+def fix_D204 (contents, doc): 
+    """Fixes D204: 1 blank line required after class docstring.
+
+    This operation will change the line numbers in file. 
+    """ 
+    manage_blank_lines (contents, doc.end + 1, True)
+    return doc
+
+@fixer ("D205")
+def fix_D205 (contents, doc): 
+    """Fixes D205: 1 blank line required between summary line and description.
+
+    This operation will change the line numbers in file. 
+    This function now only process two cases:
+    - First line that contains alpha characters ends with period 
+    - The next line starts with a capital letter that's not True or False 
+    """ 
+    canFix = False 
+    quote_type = doc.quote
+    # case 1: first line ends with period 
+    first_alpha_index = doc.text_line
+    line = contents[first_alpha_index] 
+    if line.rstrip ()[-1] == ".": 
+        canFix = True 
+    # case: the next line starts with a capital letter that's not True or False 
+    next_index = first_alpha_index + 1 
+    if next_index > doc.end: 
+        return doc
+    next_line = contents[next_index].strip()
+    exceptions = ["True", "False"] 
+    if (next_line == "" or next_line == quote_type or 
+        (next_line[0].isupper () and next_line.split ()[0][:4] not in exceptions)): 
+        canFix = True 
+    if canFix: 
+        return doc._replace (end=doc.end - manage_blank_lines (contents, next_index, True))
+    return doc
+
+@fixer ("D210")
+def fix_D210 (contents, doc): 
+    """Fixes D210: No whitespaces allowed surrounding docstring text.
+
+    This operation will NOT change the line numbers in file. 
+    """ 
+    line = contents[0] 
+    quote_type = doc.quote
+    quote_len = len (quote_type) 
+    content_start = line.find (quote_type, doc.column) + quote_len 
+    if doc.end != 0: 
+        result_line = line[:content_start] + line[content_start:].strip () + "\n"
+    else: 
+        content_end = line.rfind (quote_type) 
+        result_line = line[:content_start] + line[content_start:content_end].strip () + line[content_end:]
+    contents[0] = result_line
+    return doc
+
+@fixer ("D300")
+def fix_D300 (contents, doc): 
+    """Fixes D300: Use triple double quotes for docstrings.
+
+    This operation will NOT change the line numbers in file. 
+    """ 
+    quote_type = doc.quote
+    # only replace the opening and the closing quotes, the line may hold other strings
+    line = contents[0]
+    quote_start = line.find (quote_type, doc.column)
+    contents[0] = line[:quote_start] + '"""' + line[quote_start + len (quote_type):]
+    line = contents[doc.end]
+    quote_start = line.rfind (quote_type)
+    contents[doc.end] = line[:quote_start] + '"""' + line[quote_start + len (quote_type):]
+    return doc._replace (quote='"""')
+
+@fixer ("D301")
+def fix_D301 (contents, doc): 
+    """Fixes D301: Add r before triple double quotes if any backslashes in a docstring. 
+
+    This operation will NOT change the line numbers in file. 
+    """ 
+    line = contents[0]
+    index = doc.column
+    # the u prefix does nothing in Python 3 and cannot be combined with r, and pydocstyle
+    # only accepts a lowercase r, so R is replaced
+    prefix = "r" + "".join (c for c in doc.prefix if c not in "uUrR")
+    contents[0] = line[:index] + prefix + line[index + len (doc.prefix):]
+    return doc._replace (prefix=prefix)
+
+@fixer ("D400")
+def fix_D400 (contents, doc): 
+    """Fixes D400: First line should end with a period.
+
+    This operation will NOT change the line numbers in file. 
+    This function now only process three cases:
+    - One-line docstring
+    - First line that contains alpha characters ends with period 
+    - The next line starts with a capital letter that's not True or False         
+    """ 
+    end = doc.end
+    first_line = contents[0] 
+    quote_type = doc.quote
+    quote_len = len (quote_type) 
+    # case 1: one-line docstring
+    if end == 0: 
+        content_start = first_line.find (quote_type, doc.column) + quote_len
+        content_end = first_line.rfind (quote_type)
+        contents[0] = (first_line[:content_start] + first_line[content_start:content_end].strip () + 
+                       "." + first_line[content_end:])
+    else: 
+        # case 2: the second line starts with a capital letter
+        first_alpha_index = doc.text_line
+        line = contents[first_alpha_index] 
+        if line.rstrip ()[-1] == ".": 
+            contents[first_alpha_index] = line.rstrip () + "\n"
+            return doc
+        next_index = first_alpha_index + 1 
+        next_line = contents[next_index].strip()
+        exceptions = ["True", "False"] 
+        if (next_index > end or next_line == "" or next_line == quote_type or 
+            (next_line[0].isupper () and next_line.split ()[0][:4] not in exceptions)): 
+            if first_alpha_index == end: 
+                content_end = line.rfind (quote_type)
+                content_start = first_non_whitespace_index (line) 
+                contents[first_alpha_index] = (line[:content_start] + 
+                                               line[content_start: content_end].strip () + 
+                                               "." + line[content_end:])
+            else: 
+                contents[first_alpha_index] = line[:-1] + ".\n"
+    return doc
+
+@fixer ("D403")
+def fix_D403 (contents, doc): 
+    """Fixes D403: First word of the first line should be properly capitalized.
+
+    This operation will NOT change the line numbers in file. 
+    """ 
+    first_alpha_index = doc.text_line
+    line = contents[first_alpha_index]
+    # skip the prefix and the opening quotes on the first line
+    text_start = 0
+    if first_alpha_index == 0: 
+        text_start = line.find (doc.quote, doc.column) + len (doc.quote)
+    for i in range (text_start, len (line)): 
+        if line[i].isalpha (): 
+            temp_list = line[i:].split (" ")
+            temp_list[0] = temp_list[0].title () 
+            contents[first_alpha_index] = line[:i] + " ".join (temp_list)
+            break 
+    return doc
+
+
+@fixer ("D412")
+def fix_D412 (contents, doc): 
+    """Fixes D412: No blank lines allowed between a section header and its content
+    In the case that its section header is 'Parameters' which indicates a different style of docstring.
+
+    This operation will change the line numbers in file. 
+    """ 
+    quote_type = doc.quote
+    line_index = 0
+    while contents[line_index].strip () != "Parameters:": 
+        line_index += 1 
+        if line_index > doc.end: 
+            return doc
+    contents[line_index] = ""
+    doc = doc._replace (end=doc.end - manage_blank_lines (contents, line_index))
+    line = contents[line_index]
+    starting_index = first_non_whitespace_index(line)
+    while line_index <= doc.end: 
+        line = contents[line_index]
+        closing = ""
+        if line_index == doc.end: 
+            # the closing quotes can follow the text of the last parameter
+            quote_start = line.rfind (quote_type)
+            closing = line[quote_start:]
+            line = line[:quote_start].rstrip () + "\n"
+        if line.strip () == "" or line.strip () == quote_type: 
+            break
+        original = line
+        if (" --" in line):
+            line = line.replace(" --", ":")
+            starting_index = first_non_whitespace_index(line)
+            line = line[:starting_index] + ":param " + line [starting_index:]
+        # the last line of the section cannot continue on the closing line
+        if original[-2].isalnum() == False and (closing or starting_index >= first_non_whitespace_index(contents[line_index + 1])):
+            line = line[:-2] + "\n"
+        contents[line_index] = line[:-1] + closing if closing else line
+        line_index += 1 
+    return doc
+
+
 class AutoDoc (object): 
     """A class that generates and fixes PEP 257 violations for a python file.
     
-    Note: functions that modifies the line numbers need to call adjust_line_num with a change log
+    Note: error line numbers always refer to the lines the round of fixes starts from, every
+    docstring with violations is visited once per round and all of its fixers are applied to it in memory
     """
 
-    def __init__ (self, fname, error_pairs=None): 
+    def __init__ (self, fname, error_pairs=None, checker=None, stats=None, rounds=1, memo=None): 
         """Initialize file name.
 
         :param fname: The file to be processed
+        :param error_pairs: The violations of the file, generated with checker when None
+        :param checker: The Checker used to find violations
+        :param stats: A FileStats that records timings and fix counts, nothing is recorded when None
+        :param rounds: The maximum number of rounds of fixes, each round after the first one only
+                       fixes the docstrings edited by the previous round
+        :param memo: A FixMemo shared with other files, docstring regions found in it are not fixed again
         """
         self.fname = fname
         self.error_pairs = error_pairs
+        self.checker = checker or Checker ()
+        self.stats = stats
+        self.rounds = rounds
+        self.memo = memo
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.original = None
         self.contents = None
+        self.buffer = None
+        self.docstrings = None
+        self.changed = False
+        self.unconverged = {}
     
     def generate_error_pairs (self): 
         """Generate error pairs for file.
@@ -38,284 +288,127 @@ class AutoDoc (object):
         :return: A dict from the error code to a list of line numbers that have that error
         :rtype: dict 
         """
-        # run pydocstyle 
-        process = subprocess.run (['pydocstyle', self.fname], stdout=subprocess.PIPE)
-        process
-        errors = [error.strip () for error in process.stdout.decode ("utf-8").split ("\n")]
-        error_pairs = defaultdict (list) 
-        for i in range (len (errors) // 2):
-            index = i * 2
-            # line number 
-            line_num = int (errors[index].split (" ")[0][len (self.fname)+1:])
-            # error code 
-            error_pairs[errors[index+1][:4]].append (line_num)
-        return error_pairs
-
-    def fix_D200 (self):
-        """Fixes D200: One-line docstring should fit on one line with quotes.
-        
-        This operation will change the line numbers in file. 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D200"] 
-
-        if error_lines_num: 
-            log = []
-            def make_single_line (contents, error_lines_num): 
-                line_index = error_lines_num[0] - 1
-                quote_type = get_quote_type (contents[line_index]) 
-                start, end, raw_docs = extract_docstring (contents, line_index) 
-                quote_len = len (quote_type) 
-                content_start = raw_docs.find (quote_type) + quote_len
-                content_end = raw_docs.rfind (quote_type) 
-                result_docs = (raw_docs[:content_start] + raw_docs.strip ()[quote_len:-quote_len].strip () + 
-                               raw_docs[content_end:]) 
-                # remove original docstring and insert new docstring
-                contents[start:end+1] = [result_docs]
-                log.append ((start, end - start)) 
-                error_lines_num.pop (0)
-                return [x - (end - start) for x in error_lines_num]
-            while error_lines_num: 
-                error_lines_num = make_single_line (contents, error_lines_num) 
-            adjust_line_num (contents, self.error_pairs, log)
-            self.contents = contents
-
-    def fix_D202 (self): 
-        """Fixes D202: No blank lines allowed after function docstring.
-        
-        This operation will change the line numbers in file. 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D202"] 
-
-        if error_lines_num: 
-            log = []
-            def remove_blank_lines (contents, error_lines_num): 
-                line_index = error_lines_num[0] - 1
-                start, end, _ = extract_docstring (contents, line_index) 
-                return manage_blank_lines(contents, end + 1, log, error_lines_num)
-            while error_lines_num: 
-                error_lines_num = remove_blank_lines (contents, error_lines_num) 
-            adjust_line_num (contents, self.error_pairs, log)
-            self.contents = contents
-
-    def fix_D204 (self): 
-        """Fixes D204: 1 blank line required after class docstring.
-        
-        This operation will change the line numbers in file. 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D204"] 
-
-        if error_lines_num: 
-            log = []
-            def one_blank_line (contents, error_lines_num): 
-                line_index = error_lines_num[0] - 1
-                start, end, _ = extract_docstring (contents, line_index) 
-                return manage_blank_lines(contents, end + 1, log, error_lines_num, True)
-            while error_lines_num: 
-                error_lines_num = one_blank_line (contents, error_lines_num) 
-            adjust_line_num (contents, self.error_pairs, log)
-            self.contents = contents
-
-    def fix_D205 (self): 
-        """Fixes D205: 1 blank line required between summary line and description.
-
-        This operation will change the line numbers in file. 
-        This function now only process two cases:
-        - First line that contains alpha characters ends with period 
-        - The next line starts with a capital letter that's not True or False 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D205"] 
-        if error_lines_num:
-            log = [] 
-            def add_blank_line (contents, error_lines_num): 
-                canFix = False 
-                line_index = error_lines_num[0] - 1
-                start, end, _ = extract_docstring (contents, line_index) 
-                quote_type = get_quote_type (contents[start])
-                # case 1: first line ends with period 
-                first_alpha_index = get_first_alpha_index (contents, start)
-                line = contents[first_alpha_index] 
-                if line.rstrip ()[-1] == ".": 
-                    canFix = True 
-                # case: the next line starts with a capital letter that's not True or False 
-                next_index = first_alpha_index + 1 
-                next_line = contents[next_index].strip()
-                exceptions = ["True", "False"] 
-                if (next_index > end or next_line == "" or next_line == quote_type or 
-                    (next_line[0].isupper () and next_line.split ()[0][:4] not in exceptions)): 
-                    canFix = True 
-                if canFix: 
-                    return manage_blank_lines (contents, next_index, log, error_lines_num, True)
-                return error_lines_num[1:]
-            while error_lines_num: 
-                error_lines_num = add_blank_line (contents, error_lines_num) 
-            adjust_line_num (contents, self.error_pairs, log)
-            self.contents = contents
-
-    def fix_D210 (self): 
-        """Fixes D210: No whitespaces allowed surrounding docstring text.
-        
-        This operation will NOT change the line numbers in file. 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D210"] 
-        if error_lines_num:
-            def strip_whitespaces (contents, line_index):
-                start, end, _ = extract_docstring (contents, line_index) 
-                line = contents[start] 
-                quote_type = get_quote_type (line)
-                quote_len = len (quote_type) 
-                content_start = line.find (quote_type) + quote_len 
-                if end - start != 0: 
-                    result_line = line[:content_start] + line[content_start:].strip () + "\n"
-                else: 
-                    content_end = line.rfind (quote_type) 
-                    result_line = line[:content_start] + line[content_start:content_end].strip () + line[content_end:]
-                contents[line_index] = result_line
-            for line_num in error_lines_num:
-                strip_whitespaces (contents, line_num-1)
-            self.contents = contents 
-
-    def fix_D300 (self):
-        """Fixes D300: Use triple double quotes for docstrings.
-        
-        This operation will NOT change the line numbers in file. 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D300"]
-        if error_lines_num:
-            def to_triple_double_quotes (contents, line_index): 
-                start, end, _ = extract_docstring (contents, line_index)
-                quote_type = get_quote_type (contents[start]) 
-                contents[start] = contents[start].replace (quote_type, '"""') 
-                if end != start: 
-                    contents[end] = contents[end].replace (quote_type, '"""') 
-            for line_num in error_lines_num:
-                to_triple_double_quotes (contents, line_num-1)
-            self.contents = contents 
-
-    def fix_D301 (self):
-        """Fixes D301: Add r before triple double quotes if any backslashes in a docstring. 
-        
-        This operation will NOT change the line numbers in file. 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D301"]
-        if error_lines_num:
-            def make_raw_docs (contents, line_index): 
-                line = contents[line_index]
-                index = first_non_whitespace_index(line)
-                contents[line_index] = line[:index] + "r" + line[index:]
-            for line_num in error_lines_num:
-                make_raw_docs (contents, line_num-1)
-            self.contents = contents 
-
-    def fix_D400 (self): 
-        """Fixes D400: First line should end with a period.
-        
-        This operation will NOT change the line numbers in file. 
-        This function now only process three cases:
-        - One-line docstring
-        - First line that contains alpha characters ends with period 
-        - The next line starts with a capital letter that's not True or False         
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D400"] 
-        if error_lines_num:
-            def add_period (contents, line_index): 
-                start, end, _ = extract_docstring (contents, line_index) 
-                first_line = contents[start] 
-                quote_type = get_quote_type (first_line)
-                quote_len = len (quote_type) 
-                # case 1: one-line docstring
-                if end - start == 0: 
-                    content_start = first_line.find (quote_type) + quote_len
-                    content_end = first_line.rfind (quote_type)
-                    contents[start] = (first_line[:content_start] + first_line[content_start:content_end].strip () + 
-                                       "." + first_line[content_end:])
-                else: 
-                    # case 2: the second line starts with a capital letter
-                    first_alpha_index = get_first_alpha_index (contents, start)
-                    line = contents[first_alpha_index] 
-                    if line.rstrip ()[-1] == ".": 
-                        contents[first_alpha_index] = line.rstrip () + "\n"
-                        return
-                    next_index = first_alpha_index + 1 
-                    next_line = contents[next_index].strip()
-                    exceptions = ["True", "False"] 
-                    if (next_index > end or next_line == "" or next_line == quote_type or 
-                        (next_line[0].isupper () and next_line.split ()[0][:4] not in exceptions)): 
-                        if first_alpha_index == end: 
-                            content_end = line.rfind (quote_type)
-                            content_start = first_non_whitespace_index (line) 
-                            contents[first_alpha_index] = (line[:content_start] + 
-                                                           line[content_start: content_end].strip () + 
-                                                           "." + line[content_end:])
-                        else: 
-                            contents[first_alpha_index] = line[:-1] + ".\n"
-            for line_num in error_lines_num:
-                add_period (contents, line_num-1)
-            self.contents = contents 
-
-    def fix_D403 (self): 
-        """Fixes D403: First word of the first line should be properly capitalized.
-        
-        This operation will NOT change the line numbers in file. 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D403"] 
-        if error_lines_num:
-            def capitalize_first_word (contents, line_index):
-                first_alpha_index = get_first_alpha_index (contents, line_index)
-                line = contents[first_alpha_index]
-                for i in range (len (line)): 
-                    if line[i].isalpha (): 
-                        temp_list = line[i:].split (" ")
-                        temp_list[0] = temp_list[0].title () 
-                        break 
-                contents[first_alpha_index] = line[:i] + " ".join (temp_list)
-
-            for line_num in error_lines_num:
-                capitalize_first_word (contents, line_num-1)
-            self.contents = contents 
-
-    def fix_D412 (self): 
-        """Fixes D412: No blank lines allowed between a section header and its content
-        In the case that its section header is 'Parameters' which indicates a different style of docstring.
-        
-        This operation will change the line numbers in file. 
-        """ 
-        contents = self.contents 
-        error_lines_num = self.error_pairs["D412"] 
-        if error_lines_num:
-            log = [] 
-            def fix_header (contents, error_lines_num):
-                line_index = error_lines_num[0] - 1 
-                quote_type = get_quote_type (contents[line_index])
-                while contents[line_index].strip () != "Parameters:": 
-                    line_index += 1 
-                contents[line_index] = ""
-                error_lines_num = manage_blank_lines (contents, line_index, log, error_lines_num) 
-                line = contents[line_index]
-                starting_index = first_non_whitespace_index(line)
-                while line.strip () != "" and line.strip () != quote_type: 
-                    if (" --" in line):
-                        line = line.replace(" --", ":")
-                        starting_index = first_non_whitespace_index(line)
-                        line = line[:starting_index] + ":param " + line [starting_index:]
-                    if contents[line_index][-2].isalnum() == False and starting_index >= first_non_whitespace_index(contents[line_index + 1]):
-                        line = line[:-2] + "\n"
-                    contents[line_index] = line
-                    line_index += 1 
-                    line = contents[line_index] 
-                return error_lines_num
-            while error_lines_num: 
-                error_lines_num = fix_header (contents, error_lines_num) 
-            adjust_line_num (contents, self.error_pairs, log)
-            self.contents = contents
+        return self.checker.error_pairs (self.fname)
+
+    def docstring_region (self, doc): 
+        """Return the original range of lines owned by a docstring.
+
+        The range covers the docstring and the blank lines that follow it, so the regions
+        of different docstrings never overlap.
+
+        :param doc: the Docstring from the index
+        :return: the start and the end (exclusive) index of the region
+        :rtype: tuple
+        """
+        end = doc.start + doc.end + 1
+        while end < len (self.contents) and self.contents[end].strip () == "": 
+            end += 1
+        return doc.start, end
+
+    def fix_docstring (self, line_num, codes): 
+        """Apply the fixers of codes to the docstring starting at line_num.
+
+        :param line_num: the line number of the start of the docstring in the original file
+        :param codes: the error codes reported for the docstring
+        """
+        doc = self.docstrings.get (line_num)
+        if doc is None: 
+            if self.stats is not None: 
+                self.stats.skip (codes)
+            return
+        start, end = self.docstring_region (doc)
+        lines = self.contents[start:end]
+        # the fixers only need the line of code after the region to end the blank lines, it is
+        # never edited so it stays out of the memo
+        next_line = self.contents[end] if end < len (self.contents) else None
+        fixed = None
+        if self.memo is not None: 
+            key = (tuple (lines), next_line is not None, frozenset (codes))
+            fixed = self.memo.get (key)
+        if fixed is not None: 
+            self.memo_hits += 1
+            lines = list (fixed)
+            if self.stats is not None: 
+                self.stats.memo_hit (codes)
+        else: 
+            if next_line is not None: 
+                lines.append (next_line)
+            for code, fix in FIXERS.items (): 
+                if code in codes: 
+                    if self.stats is None: 
+                        doc = fix (lines, doc)
+                    else: 
+                        doc = self.stats.run_fixer (code, fix, lines, doc)
+            if next_line is not None: 
+                lines.pop ()
+            if self.memo is not None: 
+                self.memo_misses += 1
+                self.memo.put (key, lines)
+        self.buffer.write (start, end, lines)
+
+    def apply_fixes (self): 
+        """Visit every docstring with violations once and apply all of its fixers."""
+        codes_by_line = defaultdict (set)
+        for code in FIXERS: 
+            for line_num in self.error_pairs.get (code, []): 
+                codes_by_line[line_num].add (code)
+        for line_num in sorted (codes_by_line): 
+            self.fix_docstring (line_num, codes_by_line[line_num])
+
+    def converge (self): 
+        """Fix the docstrings edited by the last round again until a round edits nothing.
+
+        The edited docstrings are checked again with the native detector instead of checking
+        the whole file. Violations found in docstrings still edited by the last allowed round
+        are kept in unconverged, by line number in the fixed file.
+        """
+        if self.rounds <= 1: 
+            return
+        codes = set (FIXERS) & set (getattr (self.checker, "codes", FIXERS))
+        for round_num in range (2, self.rounds + 2): 
+            edited = self.buffer.edited_lines ()
+            if not edited: 
+                return
+            contents = self.buffer.apply ()
+            error_pairs = detect_error_pairs ("".join (contents), self.fname, codes, set (edited))
+            if not error_pairs: 
+                return
+            if round_num > self.rounds: 
+                self.unconverged = error_pairs
+                return
+            self.error_pairs = error_pairs
+            self.load (contents)
+            self.apply_fixes ()
+
+    def load (self, contents): 
+        """Index the docstrings of the lines of a file.
+
+        :param contents: a list of lines, each ending with a newline except maybe the last one,
+                         the first lines loaded are kept as the original lines of the file
+        """
+        if self.original is None: 
+            self.original = contents
+        self.contents = contents
+        self.buffer = EditBuffer (self.contents)
+        self.docstrings = index_docstrings (self.contents)
+
+    def read_lines (self): 
+        """Return the lines of the file."""
+        f = open (self.fname, "r") 
+        contents = f.readlines ()
+        f.close () 
+        return contents
+
+    def read (self): 
+        """Read the file and index its docstrings."""
+        self.load (self.read_lines ())
+
+    def write (self): 
+        """Apply the buffered fixes and write the file when its contents changed."""
+        self.contents = self.buffer.apply ()
+        self.changed = self.contents != self.original
+        if self.changed: 
+            write_atomic (self.fname, self.contents)
 
     def execute (self, debug=False): 
         """Read from and apply fixes to file.
@@ -324,56 +417,94 @@ class AutoDoc (object):
 
         Debug mode features: 
         - Print the violations before and after fixes 
-        - Print out the runtime for execution
+        - Print the runtime of each step and each fixer
         """ 
-        if debug: 
-            pydocstyle_start = time.time ()
+        if debug and self.stats is None: 
+            self.stats = FileStats (self.fname)
+        stats = self.stats
+        if stats is not None: 
+            start = time.perf_counter ()
         if self.error_pairs is None: 
             self.error_pairs = self.generate_error_pairs ()
-        if debug:
-            pydocstyle_end = time.time () 
+            if stats is not None: 
+                stats.add_time ("check", start)
 
-        f = open (self.fname, "r") 
-        self.contents = f.readlines () 
-        f.close () 
+        if stats is not None: 
+            start = time.perf_counter ()
+        contents = self.read_lines ()
+        if stats is not None: 
+            stats.add_time ("read", start)
+            start = time.perf_counter ()
+        self.load (contents)
+        if stats is not None: 
+            stats.add_time ("index", start)
     
         if debug: 
             print_errors (self.error_pairs, "BEFORE")
 
-        if debug: 
-            fix_start = time.time ()
-        self.fix_D200 ()        # one-line docstrings 
-        self.fix_D202 ()        # remove blank lines after docs
-        self.fix_D204 ()        # one blank lines after class docs
-        self.fix_D205 ()        # one blank line after summary
-        self.fix_D210 ()        # trim whitespaces 
-        self.fix_D300 ()        # use triple double quotes 
-        self.fix_D301 ()        # use raw docs for backslashes
-        self.fix_D400 ()        # add period to first line
-        self.fix_D403 ()        # first word capitalization 
-        self.fix_D412 ()
-        if debug: 
-            fix_end = time.time () 
+        if stats is not None: 
+            start = time.perf_counter ()
+        self.apply_fixes ()
+        self.converge ()
+        if stats is not None: 
+            stats.add_time ("fix", start)
+            start = time.perf_counter ()
 
-        f = open (self.fname, "w")
-        f.writelines (self.contents) 
-        f.close () 
+        self.write ()
+        if stats is not None: 
+            stats.add_time ("write", start)
+            stats.changed = self.changed
 
         if debug: 
             self.error_pairs = self.generate_error_pairs ()
             print_errors (self.error_pairs, "AFTER") 
-            print (f"pydocstyle: {pydocstyle_end - pydocstyle_start} seconds")
-            print (f"Apply fixes: {fix_end - fix_start} seconds")
+            if self.unconverged: 
+                print_errors (self.unconverged, f"NOT CONVERGED AFTER {self.rounds} ROUNDS")
+            recorder = StatsRecorder ()
+            recorder.add (stats.record ())
+            print (recorder.summary ())
+
+
+def fix_source (source, error_pairs=None, checker=None, stats=None, rounds=1, memo=None): 
+    """Return source with its violations fixed, without reading or writing any file.
+
+    :param source: the contents of a python file
+    :param error_pairs: the violations of source, generated with checker when None
+    :param checker: the Checker used to find violations
+    :param stats: a FileStats that records timings and fix counts
+    :param rounds: the maximum number of rounds of fixes, see AutoDoc
+    :param memo: a FixMemo shared with other sources
+    :rtype: str
+    """
+    obj = AutoDoc ("<string>", error_pairs, checker, stats, rounds, memo)
+    if obj.error_pairs is None: 
+        obj.error_pairs = obj.checker.source_error_pairs (source)
+    obj.load (io.StringIO (source).readlines ())
+    obj.apply_fixes ()
+    obj.converge ()
+    return "".join (obj.buffer.apply ())
 
 
 # for testing autoDoc with a file specified through command line arguments  
+# use - as the file name to fix the source read from stdin and write it to stdout
 if __name__ == "__main__":
     debug = False
     if "-d" in sys.argv:
         sys.argv.remove('-d') 
         debug = True 
-    if len (sys.argv) == 2 and os.path.isfile (sys.argv[-1]): 
-        obj = AutoDoc (sys.argv[-1]) 
+    native = False
+    if "--native" in sys.argv:
+        sys.argv.remove ("--native")
+        native = True
+    rounds = 1
+    if "--rounds" in sys.argv:
+        index = sys.argv.index ("--rounds")
+        rounds = int (sys.argv[index + 1])
+        del sys.argv[index:index + 2]
+    if len (sys.argv) == 2 and sys.argv[-1] == "-": 
+        sys.stdout.write (fix_source (sys.stdin.read (), checker=Checker (native=native), rounds=rounds))
+    elif len (sys.argv) == 2 and os.path.isfile (sys.argv[-1]): 
+        obj = AutoDoc (sys.argv[-1], checker=Checker (native=native), rounds=rounds) 
         obj.execute (debug=debug) 
     else: 
         print ("ERROR: A valid file name is required.")
\ No newline at end of file
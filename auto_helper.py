@@ -1,5 +1,19 @@
 """Helper functions for auto_doc.py."""
 
+import os
+import tempfile
+import tokenize
+from collections import namedtuple, OrderedDict
+
+# a docstring found by index_docstrings, start is the index of its first line in the file,
+# end and text_line (the first line with alphabetic characters) are offsets from start and
+# column is where the prefix or the opening quotes start on the first line, which is not 0
+# for a docstring on the line of its definition such as def f (x): "Return x."
+Docstring = namedtuple ("Docstring", ["start", "end", "quote", "prefix", "text_line", "column"])
+
+# tokens that do not change whether the next token can be a docstring
+SKIPPED_TOKENS = (tokenize.NL, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT, tokenize.ENCODING)
+
 def contain_alpha (line): 
     """Return True when line contains alphabetic characters and False otherwise."""
     for c in line: 
@@ -7,18 +21,6 @@ def contain_alpha (line):
             return True 
     return False 
 
-def get_first_alpha_index (contents, line_index): 
-    """Return the index for a line that contains alphabetic characters.
-
-    :param contents: a list of lines from a file 
-    :param line_index: the index to start 
-    :return: the first index of contents that contains alphabetic chars starting from line_index 
-    :rtype: int
-    """
-    while not (contain_alpha (contents[line_index])): 
-        line_index += 1 
-    return line_index
-
 def print_errors (error_pairs, msg=None): 
     """Print error pairs from auto_doc with an optional message to display."""
     if msg: 
@@ -48,42 +50,204 @@ def first_non_whitespace_index (line):
     """Return the index of the first non-whitespace character on the given line.""" 
     return len (line) - len (line.lstrip ())
 
-def extract_docstring (contents, line_index): 
-    """Extract information from a docstring.
+def parse_noqa (comment): 
+    """Return the error codes skipped by a noqa comment the way pydocstyle reads them, "all" for a bare noqa."""
+    if "noqa: " in comment: 
+        return "".join (comment.split ("noqa: ")[1:])
+    if comment.startswith ("# noqa"): 
+        return "all"
+    return ""
+
+def iter_docstrings (contents): 
+    """Yield the docstrings of a file in a single pass with tokenize.
+
+    A docstring is a string statement that comes first in a module, class or function.
+
+    :param contents: a list of lines from a file 
+    :return: tuples of the kind of definition ("module", "class" or "def"), the STRING token,
+             the error codes skipped by a noqa comment before the docstring and whether code
+             follows the docstring in the body of the definition
+    :rtype: generator
+    """
+    lines = iter (contents)
+    kind = "module"     # the kind of definition whose body starts at the next token
+    inline = False      # the body starts on the line of the definition
+    skipped = ""
+    first = None        # the first word of the current logical line
+    depth = 0 
+    candidate = None    # a STRING token that may be a docstring
+    found = None        # a docstring waiting for the next token to know if code follows it
+    try: 
+        for token in tokenize.generate_tokens (lambda: next (lines, "")): 
+            if token.type in (tokenize.NL, tokenize.COMMENT): 
+                if token.type == tokenize.COMMENT and kind is not None and not skipped: 
+                    skipped = parse_noqa (token.string)
+                continue
+            if found is not None: 
+                yield found + (token.type not in (tokenize.DEDENT, tokenize.ENDMARKER),)
+                found = None
+            if token.type in SKIPPED_TOKENS: 
+                continue
+            if candidate is not None: 
+                if token.type in (tokenize.NEWLINE, tokenize.ENDMARKER): 
+                    if candidate[3] or token.type == tokenize.ENDMARKER: 
+                        yield candidate[:3] + (False,)
+                    else: 
+                        found = candidate[:3]
+                candidate = None
+            if token.type == tokenize.NEWLINE: 
+                first = None
+                inline = False
+                continue
+            if kind is not None and token.type == tokenize.STRING: 
+                candidate = (kind, token, "" if inline else skipped, inline)
+            kind = None
+            if first is None or first == "async": 
+                first = token.string
+            if token.string in "([{" and token.type == tokenize.OP: 
+                depth += 1
+            elif token.string in ")]}" and token.type == tokenize.OP: 
+                depth -= 1
+            elif token.string == ":" and depth == 0 and first in ("def", "class"): 
+                kind = first
+                inline = True
+                skipped = ""
+    except (tokenize.TokenError, SyntaxError): 
+        # keep the docstrings found before the source stopped tokenizing
+        pass
+
+def index_docstrings (contents): 
+    """Index the docstrings of a file by the line number where they start.
+
     :param contents: a list of lines from a file 
-    :param line_index: the index of the start of the docstring 
-    :return: the start of the docstring, the end of the docstring, and the contents of the docstring
-    :rtype: tuple 
+    :return: a dict from the line number where a docstring starts to its Docstring
+    :rtype: dict 
+    """
+    docstrings = {}
+    for _, token, _, _ in iter_docstrings (contents): 
+        docstring = make_docstring (token)
+        docstrings[docstring.start + 1] = docstring
+    return docstrings
+
+def make_docstring (token): 
+    """Return the Docstring of a STRING token."""
+    text = token.string
+    prefix_len = len (text) - len (text.lstrip ("rRuUbBfF"))
+    quote_type = get_quote_type (text[prefix_len:])
+    body = text[prefix_len + len (quote_type):len (text) - len (quote_type)]
+    text_line = 0
+    for offset, line in enumerate (body.split ("\n")): 
+        if contain_alpha (line): 
+            text_line = offset
+            break
+    start = token.start[0] - 1
+    return Docstring (start, token.end[0] - 1 - start, quote_type, text[:prefix_len], text_line, token.start[1])
+
+class EditBuffer (object): 
+    """Collect edits to a file as patches against its original line numbers.
+
+    Patches never overlap, so all of them are applied to the original lines in a single
+    linear pass instead of splicing the file's list of lines after every fix.
     """
-    first_line = contents[line_index].strip ()
-    curr_type = get_quote_type (contents[line_index]) 
-    if curr_type == "'" or curr_type == '"' or (first_line.count(curr_type) >= 2 and first_line.rfind (curr_type) == len (first_line) - 3): 
-        return (line_index, line_index, contents[line_index])
-    start, end = line_index, line_index + 1
-    # find the end of docstring 
-    while curr_type not in contents[end]: 
-        end += 1 
-    raw_docstring = "".join (contents[start: end+1])
-    return (start, end, raw_docstring)
-
-def adjust_line_num (contents, error_pairs, log): 
-    """Adjust line numbers of contents and error_pairs given a log of changes."""
-    for error, list_line_nums in error_pairs.items ():
-        for i in range (len (list_line_nums)):
-            num = list_line_nums[i] 
-            for log_pair in log: 
-                if num - 1 > log_pair[0]: 
-                    num -= log_pair[1] 
-                else: 
-                    break 
-            list_line_nums[i] = num 
-        error_pairs[error] = list_line_nums
-            
-        
-def manage_blank_lines (contents, blank_start, log, error_lines_num, keep_one=False): 
+
+    def __init__ (self, lines): 
+        """Initialize an empty buffer.
+
+        :param lines: the original lines of the file, which are never modified
+        """
+        self.lines = lines
+        self.patches = {}
+
+    def write (self, start, end, new_lines): 
+        """Replace the original range [start, end) with new_lines."""
+        self.patches[start] = (end, new_lines)
+
+    def apply (self): 
+        """Return the lines of the file with every patch applied."""
+        result = []
+        index = 0
+        for start in sorted (self.patches): 
+            end, new_lines = self.patches[start]
+            result.extend (self.lines[index:start])
+            result.extend (new_lines)
+            index = end
+        result.extend (self.lines[index:])
+        return result
+
+    def edited_lines (self): 
+        """Return the line numbers in the patched file where the patches that changed lines start."""
+        lines = []
+        offset = 0
+        for start in sorted (self.patches): 
+            end, new_lines = self.patches[start]
+            if new_lines != self.lines[start:end]: 
+                lines.append (start + offset + 1)
+            offset += len (new_lines) - (end - start)
+        return lines
+
+class FixMemo (object): 
+    """A bounded LRU memo from a docstring region and its violations to the fixed region.
+
+    Generated code repeats byte-identical docstrings with the same violations, a memo shared
+    by the files of a run fixes each of them once.
+    """
+
+    def __init__ (self, size=4096): 
+        """Initialize an empty memo.
+
+        :param size: the number of fixed regions kept, the least recently used one is dropped first
+        """
+        self.size = size
+        self.entries = OrderedDict ()
+        self.hits = 0
+        self.misses = 0
+
+    def get (self, key): 
+        """Return the fixed lines of key, None when they are not in the memo."""
+        lines = self.entries.get (key)
+        if lines is None: 
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end (key)
+        return lines
+
+    def put (self, key, lines): 
+        """Keep the fixed lines of key, a tuple of the lines of the region and the error codes."""
+        self.entries[key] = tuple (lines)
+        if len (self.entries) > self.size: 
+            self.entries.popitem (last=False)
+
+def write_atomic (fname, contents): 
+    """Write lines to a file through a temporary file renamed over it.
+
+    A crash while writing leaves the original file untouched instead of a truncated one,
+    the permissions of the original file are kept.
+
+    :param fname: the file to write
+    :param contents: a list of lines
+    """
+    # write through symbolic links instead of replacing them
+    fname = os.path.realpath (fname)
+    directory, name = os.path.split (fname)
+    fd, temp_fname = tempfile.mkstemp (prefix="." + name + ".", suffix=".tmp", dir=directory)
+    try: 
+        with os.fdopen (fd, "w") as f: 
+            f.writelines (contents)
+        if os.path.exists (fname): 
+            os.chmod (temp_fname, os.stat (fname).st_mode & 0o7777)
+        os.replace (temp_fname, fname)
+    except BaseException: 
+        os.unlink (temp_fname)
+        raise
+
+def manage_blank_lines (contents, blank_start, keep_one=False): 
     """Delete following blank lines starting from index blank_start.
 
     Keep one blank line when keep_one is set to True
+
+    :return: the number of lines removed, -1 when a blank line was inserted
+    :rtype: int
     """ 
     blank_end = blank_start 
     while contents[blank_end].strip () == "": 
@@ -96,7 +260,5 @@ def manage_blank_lines (contents, blank_start, log, error_lines_num, keep_one=Fa
     lines_removed = blank_end - blank_start
     if lines_removed != -1: 
         contents[blank_start:blank_end] = [] 
-    log.append ((blank_start, lines_removed)) 
-    error_lines_num.pop (0)
-    return [x - lines_removed for x in error_lines_num]
+    return lines_removed
 
@@ -1,66 +1,599 @@
 """Apply auto_doc to python scripts inside a directory."""
 
 import os
-import sys
-import time 
+import json
+import time
+import argparse
+import itertools
 import subprocess
-from collections import defaultdict 
+from collections import defaultdict, deque
+from multiprocessing import Pool
 
+from auto_cache import ResultCache, CACHE_FILE
+from auto_check import Checker, IGNORED_CODES, collect_files, git_changed_files, iter_files, shard_files
 from auto_doc import AutoDoc
-from auto_helper import print_errors
-
-# options for running pydocstyle
-options = '--add-ignore=D100,D101,D102,D103,D104,D105,D106,D107,D401,D402'
-convention = '--convention=pep257'
-
-# get error pairs (dict of dicts of list) 
-def generate_error_dict(path): 
-    process = subprocess.run (['pydocstyle', path, convention, options], stdout=subprocess.PIPE)
-    process
-    errors = [error.strip () for error in process.stdout.decode ("utf-8").split ("\n")]
-    error_dict = defaultdict (dict) 
-    for i in range (len (errors) // 2):
-        index = i * 2
-        line_list = errors[index].split (":") 
-        fname = line_list[0] 
-        line_number = line_list[1].split ()[0] 
-        error_code = errors[index+1][:4]
-        if fname not in error_dict: 
-            error_dict[fname] = defaultdict (list)
-        error_dict[fname][error_code].append (int (line_number))
-    return error_dict
+from auto_helper import print_errors, FixMemo
+from auto_stats import FileStats, StatsRecorder, peak_rss
+from auto_watch import file_signature, make_watcher
+
+# one checker per process so pydocstyle is only loaded once
+checker = Checker (ignore=IGNORED_CODES, convention="pep257")
+# record the statistics of every processed file
+collect_stats = False
+# the maximum number of rounds of fixes of a file
+rounds = 1
+# the fixed docstring regions shared by the files fixed in this process, None when disabled
+memo_size = 0
+memo = None
+
+def configure (new_checker, new_collect_stats=False, new_rounds=1, new_memo_size=0):
+    """Replace the checker and the options of this process, used to pass them to worker processes.
+
+    Each process gets its own FixMemo, a memo shared between processes would cost a round trip
+    for every docstring.
+    """
+    global checker, collect_stats, rounds, memo_size, memo
+    checker = new_checker
+    collect_stats = new_collect_stats
+    rounds = new_rounds
+    memo_size = new_memo_size
+    memo = FixMemo (memo_size) if memo_size > 0 else None
 
-debug = False
-path = os.getcwd()
-if "-d" in sys.argv:
-    sys.argv.remove('-d') 
-    debug = True 
-path = os.getcwd ()
-if len (sys.argv) == 2: 
-    path = sys.argv[-1]
-if debug: 
-    overview_dict = defaultdict (int) 
-    error_dict = generate_error_dict (path) 
-    for fname in error_dict: 
-        error_pairs = error_dict[fname] 
-        for i in error_pairs: 
-            overview_dict[i] += len (error_pairs[i])
-    print_errors (overview_dict, "BEFORE")
-    total_time_start = time.time ()
-
-# apply auto_doc to every file that has errors 
-error_dict = generate_error_dict(path) 
-for fname in error_dict: 
-    obj = AutoDoc (fname, error_dict[fname])
+def check_file (fname):
+    """Return the file name together with its error pairs and the runtime of the check."""
+    start = time.perf_counter ()
+    error_pairs = checker.error_pairs (fname)
+    return fname, error_pairs, time.perf_counter () - start
+
+def fix_file (item, stats=None):
+    """Apply auto_doc to a (file name, error pairs, runtime of the check) item.
+
+    The runtime of the check, done before the item was made, is added to the check phase of
+    the statistics.
+
+    :param stats: the FileStats of the file, created when collect_stats is set and stats is None
+    :return: whether the file changed, the statistics record of the file, None without collect_stats,
+             the violations left in docstrings that did not converge within the rounds and the
+             number of memo hits and misses of the file
+    :rtype: tuple
+    """
+    fname, error_pairs, check_time = item
+    if stats is None and collect_stats:
+        stats = FileStats (fname)
+    if stats is not None:
+        stats.add_seconds ("check", check_time)
+    obj = AutoDoc (fname, error_pairs, checker, stats, rounds, memo)
     obj.execute ()
-if debug:
-    total_time_end = time.time () 
-    print (f"Total time: {total_time_end - total_time_start} seconds\n")
-
-    overview_dict = defaultdict (int) 
-    error_dict = generate_error_dict (path) 
-    for fname in error_dict: 
-        error_pairs = error_dict[fname] 
-        for i in error_pairs: 
-            overview_dict[i] += len (error_pairs[i])
-    print_errors (overview_dict, "AFTER")
+    return obj.changed, stats and stats.record (), obj.unconverged, (obj.memo_hits, obj.memo_misses)
+
+def process_file (item):
+    """Check a (file name, error pairs) item when its error pairs are None and apply auto_doc to it.
+
+    :return: the file name, its error pairs and the results of fix_file
+    :rtype: tuple
+    """
+    fname, error_pairs = item
+    stats = FileStats (fname) if collect_stats else None
+    if error_pairs is None:
+        if stats is not None:
+            start = time.perf_counter ()
+        error_pairs = checker.error_pairs (fname)
+        if stats is not None:
+            stats.add_time ("check", start)
+    if error_pairs:
+        return (fname, error_pairs, *fix_file ((fname, error_pairs, 0), stats))
+    return fname, error_pairs, False, stats and stats.record (), {}, (0, 0)
+
+def stream_jobs (func, items, jobs):
+    """Yield func of each item in order, with at most 2 * jobs items in flight at any time."""
+    if jobs <= 1:
+        for item in items:
+            yield func (item)
+        return
+    with Pool (jobs, initializer=configure, initargs=(checker, collect_stats, rounds, memo_size)) as pool:
+        pending = deque ()
+        for item in items:
+            pending.append (pool.apply_async (func, (item,)))
+            if len (pending) >= jobs * 2:
+                yield pending.popleft ().get ()
+        while pending:
+            yield pending.popleft ().get ()
+
+def make_pool (jobs):
+    """Return a pool of jobs worker processes configured like this process."""
+    return Pool (jobs, initializer=configure, initargs=(checker, collect_stats, rounds, memo_size))
+
+def run_jobs (func, items, jobs, pool=None):
+    """Map func over items with a pool of jobs worker processes, keeping the order of items.
+
+    :param pool: a pool from make_pool that is reused instead of starting a new one
+    """
+    if jobs <= 1:
+        return [func (item) for item in items]
+    chunksize = max (1, len (items) // (jobs * 4))
+    if pool is not None:
+        return pool.map (func, items, chunksize)
+    with make_pool (jobs) as pool:
+        return pool.map (func, items, chunksize)
+
+def check_files (fnames, jobs=1, cache=None, pool=None, timings=None):
+    """Return a dict from each of the file names to its error pairs, in the order of fnames.
+
+    :param fnames: a list of file names
+    :param jobs: the number of worker processes that share the files
+    :param cache: a ResultCache, only files whose contents are not cached are checked
+    :param pool: a pool from make_pool that is reused instead of starting a new one
+    :param timings: a dict that receives the runtime of the check of each file that was not cached
+    :rtype: dict
+    """
+    cached = {}
+    if cache is not None:
+        for fname in fnames:
+            error_pairs = cache.get (fname)
+            if error_pairs is not None:
+                cached[fname] = error_pairs
+    checked = run_jobs (check_file, [fname for fname in fnames if fname not in cached], jobs, pool)
+    if cache is not None:
+        for fname, error_pairs, _ in checked:
+            cache.put (fname, error_pairs)
+    if timings is not None:
+        for fname, _, seconds in checked:
+            timings[fname] = seconds
+    checked = {fname: error_pairs for fname, error_pairs, _ in checked}
+    return {fname: cached[fname] if fname in cached else checked[fname] for fname in fnames}
+
+# get error pairs (dict of dicts of list)
+def generate_error_dict (path, jobs=1, cache=None, fnames=None, timings=None):
+    """Return the error pairs of every file under path that has violations.
+
+    :param path: a file or a directory
+    :param jobs: the number of worker processes that share the files
+    :param cache: a ResultCache, only files whose contents are not cached are checked
+    :param fnames: the files to check instead of every file under path
+    :param timings: a dict that receives the runtime of the check of each file, the files are
+                    then checked one at a time
+    :rtype: dict
+    """
+    if jobs <= 1 and cache is None and fnames is None and timings is None:
+        return checker.error_dict (path)
+    if fnames is None:
+        fnames = collect_files (path)
+    error_dict = defaultdict (dict)
+    for fname, error_pairs in check_files (fnames, jobs, cache, timings=timings).items ():
+        if error_pairs:
+            error_dict[fname] = error_pairs
+    return error_dict
+
+def add_errors (overview_dict, error_pairs):
+    """Add the number of violations of each error code in error_pairs to overview_dict."""
+    for i in error_pairs:
+        overview_dict[i] += len (error_pairs[i])
+
+def print_writes (rewritten, unchanged):
+    """Print the number of files auto_doc rewrote and the number of files with violations it left unchanged."""
+    print (f"Files: {rewritten} rewritten, {unchanged} unchanged\n")
+
+def print_memo (hits, misses):
+    """Print the hits and misses of the memo of fixed docstrings."""
+    print (f"Memo: {hits} hits, {misses} misses, {hits / max (hits + misses, 1):.0%} hit rate\n")
+
+def print_peak_rss ():
+    """Print the peak resident set size of this process and of its largest worker process."""
+    own, workers = peak_rss ()
+    if own is None:
+        return
+    print (f"Peak RSS: {own / 2 ** 20:.1f} MB, workers {workers / 2 ** 20:.1f} MB\n")
+
+def print_unconverged (fname, error_pairs):
+    """Print the violations left in the docstrings of a file that were still edited by the last round."""
+    violations = ", ".join (f"{code} {lines}" for code, lines in sorted (error_pairs.items ()))
+    print (f"Not converged after {rounds} rounds: {fname}: {violations}")
+
+def make_report (before, after, rewritten, unchanged, seconds):
+    """Return the summary of a run that can be written as JSON and merged with other runs.
+
+    :param before: a dict from the error code to the number of violations before fixes
+    :param after: a dict from the error code to the number of violations after fixes, None when not verified
+    :param rewritten: the number of files auto_doc rewrote
+    :param unchanged: the number of files with violations auto_doc left unchanged
+    :param seconds: the runtime
+    :rtype: dict
+    """
+    return {"before": dict (before), "after": None if after is None else dict (after),
+            "rewritten": rewritten, "unchanged": unchanged, "seconds": seconds}
+
+def print_overview (report, note=""):
+    """Print the violations before and after fixes and the runtime of a report, see make_report."""
+    print_errors (report["before"], "BEFORE")
+    print (f"Total time: {report['seconds']} seconds{note}\n")
+    if report["after"] is not None:
+        print_errors (report["after"], "AFTER")
+
+
+class Overview (object):
+    """The counters of a run that make its overview and its report.
+
+    Every mode adds the files it checks and fixes to an Overview, so all of them print the same
+    overview. Only counters are kept, except the files rewritten since the last verify when the
+    run verifies them.
+    """
+
+    def __init__ (self, cache=None, recorder=None, keep_changed=False):
+        """Initialize empty counters and start the clock of the run.
+
+        :param cache: a ResultCache that is told which files auto_doc left unchanged and saved by finish
+        :param recorder: a StatsRecorder that receives the statistics of every fixed file
+        :param keep_changed: keep the names of the rewritten files in changed_files, for verify
+        """
+        self.cache = cache
+        self.recorder = recorder
+        self.keep_changed = keep_changed
+        self.before = defaultdict (int)
+        self.after = defaultdict (int)
+        self.rewritten = 0
+        self.unchanged = 0
+        self.memo_hits = 0
+        self.memo_misses = 0
+        # files rewritten since the last verify, with keep_changed, they are checked again for the
+        # overview after fixes
+        self.changed_files = []
+        self.verified = False
+        self.start = time.time ()
+        # the runtime of verify, left out of the runtime of the run
+        self.verify_time = 0
+
+    def add_checked (self, error_pairs):
+        """Count the violations of a checked file before fixes."""
+        add_errors (self.before, error_pairs)
+
+    def add_unchanged (self, error_pairs):
+        """Count a file with violations that is not rewritten, its violations are kept after fixes."""
+        add_errors (self.after, error_pairs)
+        self.unchanged += bool (error_pairs)
+
+    def add_result (self, fname, error_pairs, result):
+        """Count the result of fix_file for a file.
+
+        :param fname: the file
+        :param error_pairs: the violations of the file before fixes
+        :param result: the tuple returned by fix_file
+        """
+        changed, record, unconverged, (memo_hits, memo_misses) = result
+        self.memo_hits += memo_hits
+        self.memo_misses += memo_misses
+        if unconverged:
+            print_unconverged (fname, unconverged)
+        if self.recorder is not None:
+            self.recorder.add (record)
+        if changed:
+            self.rewritten += 1
+            if self.keep_changed:
+                self.changed_files.append (fname)
+            return
+        self.add_unchanged (error_pairs)
+        if self.cache is not None and error_pairs:
+            self.cache.mark_fixed (fname)
+
+    def verify (self, jobs=1, pool=None):
+        """Check the files rewritten since the last verify again and count their violations after fixes."""
+        start = time.time ()
+        for error_pairs in check_files (self.changed_files, jobs, self.cache, pool).values ():
+            add_errors (self.after, error_pairs)
+        self.changed_files = []
+        self.verified = True
+        self.verify_time += time.time () - start
+
+    def finish (self, debug=False):
+        """Print the overview of the run, save the cache and return the report of the run.
+
+        :param debug: also print the violations before and after fixes, the runtime, the memo,
+                      the peak memory and the cache
+        :return: the report of the run, see make_report
+        :rtype: dict
+        """
+        report = make_report (self.before, self.after if self.verified else None, self.rewritten, self.unchanged,
+                              time.time () - self.start - self.verify_time)
+        print_writes (self.rewritten, self.unchanged)
+        if debug:
+            print_overview (report)
+            if memo_size > 0:
+                print_memo (self.memo_hits, self.memo_misses)
+            print_peak_rss ()
+            if self.cache is not None:
+                print (f"Cache: {self.cache.hits} hits, {self.cache.misses} misses\n")
+        if self.cache is not None:
+            self.cache.save ()
+        return report
+
+
+def run (path, debug=False, jobs=1, cache=None, recorder=None, fnames=None, verify=False):
+    """Apply auto_doc to every file under path that has violations.
+
+    :param path: a file or a directory
+    :param debug: Print the violations before and after fixes and the runtime
+    :param jobs: the number of worker processes used for checking and fixing
+    :param cache: a ResultCache that skips files whose contents did not change since the last run
+    :param recorder: a StatsRecorder that receives the statistics of every fixed file
+    :param fnames: the files to check and fix instead of every file under path
+    :param verify: count the violations after fixes, always done in debug mode
+    :return: the report of the run, see make_report
+    :rtype: dict
+
+    The overview before fixes comes from the scan that drives the fixes and only the files
+    auto_doc changed are checked again for the overview after fixes.
+    """
+    overview = Overview (cache, recorder, debug or verify)
+    timings = {} if collect_stats else None
+    error_dict = generate_error_dict (path, jobs, cache, fnames, timings)
+
+    # apply auto_doc to every file that has errors
+    items = []
+    for fname, error_pairs in sorted (error_dict.items ()):
+        overview.add_checked (error_pairs)
+        if cache is not None and cache.is_fixed (fname):
+            overview.add_unchanged (error_pairs)
+        else:
+            items.append ((fname, error_pairs, timings.get (fname, 0) if timings else 0))
+    for (fname, error_pairs, _), result in zip (items, run_jobs (fix_file, items, jobs)):
+        overview.add_result (fname, error_pairs, result)
+    if debug or verify:
+        overview.verify (jobs)
+    return overview.finish (debug)
+
+def run_stream (path, debug=False, jobs=1, cache=None, recorder=None, fnames=None, verify=False):
+    """Check and fix the files under path as a stream.
+
+    Each file is handed to auto_doc as soon as its violations are known instead of after the whole
+    tree is checked. Only counters are kept for the overview and at most 2 * jobs files are in
+    flight, so memory does not grow with the size of the tree.
+
+    :param path: a file or a directory
+    :param debug: Print the violations before and after fixes and the runtime
+    :param jobs: the number of worker processes used for checking and fixing
+    :param cache: a ResultCache that skips files whose contents did not change since the last run
+    :param recorder: a StatsRecorder that receives the statistics of every processed file
+    :param fnames: the files to check and fix instead of every file under path
+    :param verify: count the violations after fixes, always done in debug mode
+    :return: the report of the run, see make_report
+    :rtype: dict
+    """
+    overview = Overview (cache, recorder, debug or verify)
+
+    def items ():
+        if jobs <= 1 and cache is None and fnames is None and not collect_stats:
+            # check in this process, pydocstyle's output is consumed as it is produced
+            yield from checker.stream (path)
+            return
+        for fname in iter_files (path) if fnames is None else fnames:
+            error_pairs = None
+            if cache is not None:
+                error_pairs = cache.get (fname)
+                if error_pairs is not None and (not error_pairs or cache.is_fixed (fname)):
+                    overview.add_checked (error_pairs)
+                    overview.add_unchanged (error_pairs)
+                    continue
+            yield fname, error_pairs
+
+    for fname, error_pairs, *result in stream_jobs (process_file, items (), jobs):
+        overview.add_checked (error_pairs)
+        if cache is not None:
+            cache.put (fname, error_pairs)
+        overview.add_result (fname, error_pairs, result)
+    if debug or verify:
+        overview.verify (jobs)
+    return overview.finish (debug)
+
+def iter_batches (items, size):
+    """Yield lists of at most size consecutive items."""
+    items = iter (items)
+    while True:
+        batch = list (itertools.islice (items, size))
+        if not batch:
+            return
+        yield batch
+
+def run_batched (path, debug=False, jobs=1, cache=None, recorder=None, fnames=None, verify=False, batch_size=500):
+    """Check and fix the files under path in batches of batch_size files.
+
+    The directory is walked lazily and each batch is checked, fixed and, in debug mode, checked
+    again before the next batch is read. Only counters outlive a batch, so memory is bounded
+    by the batch size instead of the size of the tree. One pool of worker processes serves
+    every batch.
+
+    :param path: a file or a directory
+    :param debug: Print the violations before and after fixes, the runtime and the peak memory
+    :param jobs: the number of worker processes used for checking and fixing
+    :param cache: a ResultCache that skips files whose contents did not change since the last run
+    :param recorder: a StatsRecorder that receives the statistics of every fixed file
+    :param fnames: the files to check and fix instead of every file under path
+    :param verify: count the violations after fixes, always done in debug mode
+    :param batch_size: the number of files checked and fixed together
+    :return: the report of the run, see make_report
+    :rtype: dict
+    """
+    overview = Overview (cache, recorder, debug or verify)
+    pool = make_pool (jobs) if jobs > 1 else None
+    try:
+        for batch in iter_batches (iter_files (path) if fnames is None else fnames, batch_size):
+            timings = {}
+            items = []
+            for fname, error_pairs in check_files (batch, jobs, cache, pool, timings).items ():
+                if not error_pairs:
+                    continue
+                overview.add_checked (error_pairs)
+                if cache is not None and cache.is_fixed (fname):
+                    overview.add_unchanged (error_pairs)
+                else:
+                    items.append ((fname, error_pairs, timings.get (fname, 0)))
+            for (fname, error_pairs, _), result in zip (items, run_jobs (fix_file, items, jobs, pool)):
+                overview.add_result (fname, error_pairs, result)
+            if debug or verify:
+                overview.verify (jobs, pool)
+    finally:
+        if pool is not None:
+            pool.close ()
+            pool.join ()
+    return overview.finish (debug)
+
+def watch (path, jobs=1, debounce=0.2, poll=False, recorder=None):
+    """Check and fix the files under path every time they are saved, until interrupted.
+
+    Saves are collected until no file changes for debounce seconds, then only the files saved
+    are checked and fixed. The signature of every file auto_doc rewrites is kept, so the events
+    of its own writes are recognized and ignored instead of fixing the file again.
+
+    :param path: a file or a directory
+    :param jobs: the number of worker processes used for checking and fixing
+    :param debounce: the seconds without changes that end a burst of saves
+    :param poll: find changes by polling even when inotify is available
+    :param recorder: a StatsRecorder that receives the statistics of every fixed file
+    """
+    watcher = make_watcher (path, poll)
+    # signature of each file right after auto_doc rewrote it
+    written = {}
+    print (f"Watching {path} ({watcher.name}), press Ctrl+C to stop\n")
+    try:
+        while True:
+            fnames = watcher.wait ()
+            while True:
+                more = watcher.wait (debounce)
+                if not more:
+                    break
+                fnames |= more
+            fnames = sorted (fname for fname in fnames if written.pop (fname, None) != file_signature (fname)
+                             and os.path.isfile (fname))
+            if not fnames:
+                continue
+            overview = Overview (recorder=recorder, keep_changed=True)
+            timings = {}
+            items = [(fname, error_pairs, timings[fname])
+                     for fname, error_pairs in check_files (fnames, jobs, timings=timings).items () if error_pairs]
+            for (fname, error_pairs, _), result in zip (items, run_jobs (fix_file, items, jobs)):
+                overview.add_result (fname, error_pairs, result)
+            for fname in overview.changed_files:
+                written[fname] = file_signature (fname)
+            print (f"{time.strftime ('%H:%M:%S')} {len (fnames)} saved, {len (items)} with violations, "
+                   f"{overview.rewritten} rewritten")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close ()
+
+def merge_reports (reports):
+    """Combine the reports of shards into the report of the whole run.
+
+    The runtime of the merged report is the runtime of the slowest shard, the shards run side by side.
+
+    :param reports: a list of reports, see make_report
+    :rtype: dict
+    """
+    before = defaultdict (int)
+    after = defaultdict (int)
+    verified = True
+    for report in reports:
+        for code, count in report["before"].items ():
+            before[code] += count
+        if report["after"] is None:
+            verified = False
+            continue
+        for code, count in report["after"].items ():
+            after[code] += count
+    return make_report (before, after if verified else None, sum (report["rewritten"] for report in reports),
+                        sum (report["unchanged"] for report in reports),
+                        max ((report["seconds"] for report in reports), default=0))
+
+def parse_shard (text):
+    """Parse a shard such as "2/4" into the shard index, from 1, and the number of shards."""
+    try:
+        index, count = (int (part) for part in text.split ("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError (f"expected i/N, got {text!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError (f"the shard index must be between 1 and {count}")
+    return index, count
+
+def merge (fnames):
+    """Print the overview of the shard reports in fnames like a single run in debug mode does."""
+    reports = []
+    for fname in fnames:
+        with open (fname, "r") as f:
+            reports.append (json.load (f))
+    shards = sorted (parse_shard (report["shard"]) for report in reports if report.get ("shard"))
+    counts = {count for _, count in shards}
+    if len (counts) > 1 or (counts and [index for index, _ in shards] != list (range (1, counts.pop () + 1))):
+        print (f"WARNING: incomplete or inconsistent shards {[report.get ('shard') for report in reports]}\n")
+    report = merge_reports (reports)
+    print_writes (report["rewritten"], report["unchanged"])
+    print_overview (report, " (slowest shard)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser (description=__doc__)
+    parser.add_argument ("path", nargs="?", default=os.getcwd ())
+    parser.add_argument ("-d", dest="debug", action="store_true", help="print an overview before and after fixes")
+    parser.add_argument ("-j", "--jobs", type=int, default=1, help="number of worker processes")
+    parser.add_argument ("--stream", action="store_true", help="fix each file as soon as it is checked")
+    parser.add_argument ("--batch", type=int, metavar="N",
+                         help="check and fix the files in batches of N files, keeping memory bounded")
+    parser.add_argument ("--cache", nargs="?", const=CACHE_FILE, help="skip files whose contents are in this cache file")
+    parser.add_argument ("--changed", nargs="?", const="HEAD", metavar="REF",
+                         help="only process files git reports as changed since their merge base with REF (default HEAD)")
+    parser.add_argument ("--staged", action="store_true", help="only process files staged for commit")
+    parser.add_argument ("--rounds", type=int, default=1,
+                         help="fix the docstrings edited by a round again, up to this number of rounds")
+    parser.add_argument ("--shard", type=parse_shard, metavar="i/N",
+                         help="only process the i-th of N shards of the files, partitioned by path hash")
+    parser.add_argument ("--report", help="write the counts before and after fixes and the runtime to this JSON file")
+    parser.add_argument ("--merge", nargs="+", metavar="REPORT", help="print the overview of shard reports and exit")
+    parser.add_argument ("--watch", action="store_true", help="check and fix the files every time they are saved")
+    parser.add_argument ("--poll", action="store_true", help="find saved files by polling instead of inotify")
+    parser.add_argument ("--debounce", type=float, default=0.2,
+                         help="seconds without saves before the saved files are fixed in watch mode")
+    parser.add_argument ("--native", action="store_true", help="detect violations without pydocstyle")
+    parser.add_argument ("--stats", action="store_true", help="print timings and fix counts per fixer and file")
+    parser.add_argument ("--stats-file", help="write the statistics of each file to this file as JSON lines")
+    parser.add_argument ("--cache-size", type=int, default=100000, help="maximum number of cache entries")
+    parser.add_argument ("--memo-size", type=int, default=4096,
+                         help="number of fixed docstrings reused for identical docstrings, 0 disables the memo")
+    args = parser.parse_args ()
+    if args.merge:
+        merge (args.merge)
+        parser.exit ()
+    fnames = None
+    if args.changed or args.staged:
+        try:
+            fnames = git_changed_files (args.path, args.changed, args.staged)
+        except (OSError, subprocess.CalledProcessError) as e:
+            parser.error (f"cannot list the changed files with git: {e}")
+    if args.shard:
+        root = args.path if os.path.isdir (args.path) else os.path.dirname (args.path)
+        fnames = shard_files (collect_files (args.path) if fnames is None else fnames, root, *args.shard)
+    recorder = None
+    if args.stats or args.stats_file:
+        recorder = StatsRecorder (args.stats_file)
+    configure (Checker (ignore=IGNORED_CODES, convention="pep257", native=args.native), recorder is not None, args.rounds, args.memo_size)
+    cache = None
+    if args.cache:
+        cache = ResultCache (args.cache, checker.settings (args.path), args.cache_size)
+    if args.watch:
+        watch (args.path, args.jobs, args.debounce, args.poll, recorder)
+        if recorder is not None:
+            recorder.close ()
+            print (recorder.summary ())
+        parser.exit ()
+    options = {}
+    if args.batch:
+        run_func = run_batched
+        options["batch_size"] = args.batch
+    else:
+        run_func = run_stream if args.stream else run
+    report = run_func (args.path, debug=args.debug, jobs=args.jobs, cache=cache, recorder=recorder, fnames=fnames,
+                       verify=args.report is not None, **options)
+    if args.report:
+        report["path"] = args.path
+        report["shard"] = "{}/{}".format (*args.shard) if args.shard else None
+        with open (args.report, "w") as f:
+            json.dump (report, f, indent=2)
+    if recorder is not None:
+        recorder.close ()
+        print (recorder.summary ())
@@ -0,0 +1,133 @@
+"""Serve auto_doc on a local Unix socket so repeated requests skip startup.
+
+The checker and a memo of fixed sources stay warm between requests. Requests come from
+auto_client, one JSON object per line:
+
+- {"command": "fix_source", "source": ...} answers {"source": the fixed source}
+- {"command": "fix_file", "file": ...} fixes the file in place and answers {"changed": ...}
+- {"command": "shutdown"} stops the server
+
+Only connections from processes of the user running the server are answered.
+"""
+
+import os
+import stat
+import sys
+import json
+import socket
+import hashlib
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+
+from auto_check import Checker, IGNORED_CODES
+from auto_client import default_socket, peer_uid
+from auto_doc import AutoDoc, fix_source
+from auto_helper import FixMemo
+
+
+class RequestHandler (socketserver.StreamRequestHandler):
+    """Answer each request line of a connection with a response line."""
+
+    def handle (self):
+        """Dispatch the requests of a connection until the client closes it.
+
+        The connection is closed at once when the client runs as another user.
+        """
+        if peer_uid (self.request) != os.getuid ():
+            return
+        for line in self.rfile:
+            try:
+                response = self.server.dispatch (json.loads (line))
+            except Exception as e:
+                response = {"error": f"{type (e).__name__}: {e}"}
+            self.wfile.write (json.dumps (response).encode ("utf-8") + b"\n")
+            self.wfile.flush ()
+
+
+class Server (socketserver.UnixStreamServer):
+    """A Unix socket server that keeps a checker and the fixes of recent sources in memory.
+
+    Requests are handled one at a time, in the order connections arrive.
+    """
+
+    def __init__ (self, path=None, checker=None, memo_size=1024):
+        """Bind the socket, replacing a stale socket file left by a server of the current user that is gone.
+
+        :param path: the socket file, default_socket when None
+        :param checker: the Checker used to find violations
+        :param memo_size: the number of fixed sources kept in memory, four times as many fixed
+                          docstrings are kept for the files and sources that are not in it
+        """
+        path = path or default_socket ()
+        if os.path.lexists (path):
+            st = os.lstat (path)
+            if not stat.S_ISSOCK (st.st_mode) or st.st_uid != os.getuid ():
+                raise OSError (f"{path} is not a socket of the current user")
+            with socket.socket (socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                if sock.connect_ex (path) == 0:
+                    raise OSError (f"a server is already listening on {path}")
+            os.unlink (path)
+        super ().__init__ (path, RequestHandler)
+        self.path = path
+        self.checker = checker or Checker (ignore=IGNORED_CODES, convention="pep257")
+        self.memo = OrderedDict ()
+        self.memo_size = memo_size
+        self.fix_memo = FixMemo (memo_size * 4)
+
+    def dispatch (self, request):
+        """Run a request and return its response.
+
+        :param request: a dict with the command and its arguments
+        :rtype: dict
+        """
+        command = request.get ("command")
+        if command == "fix_source":
+            return {"source": self.fix_source (request["source"])}
+        if command == "fix_file":
+            obj = AutoDoc (request["file"], None, self.checker, memo=self.fix_memo)
+            obj.execute ()
+            return {"changed": obj.changed}
+        if command == "shutdown":
+            # shutdown waits for serve_forever, which is busy with this request
+            threading.Thread (target=self.shutdown).start ()
+            return {}
+        raise ValueError (f"unknown command {command!r}")
+
+    def fix_source (self, source):
+        """Return source with its violations fixed, from the memo when it was fixed recently."""
+        key = hashlib.sha1 (source.encode ("utf-8")).hexdigest ()
+        fixed = self.memo.get (key)
+        if fixed is None:
+            fixed = fix_source (source, checker=self.checker, memo=self.fix_memo)
+            self.memo[key] = fixed
+            if len (self.memo) > self.memo_size:
+                self.memo.popitem (last=False)
+        else:
+            self.memo.move_to_end (key)
+        return fixed
+
+    def server_close (self):
+        """Close the socket and remove the socket file."""
+        super ().server_close ()
+        if os.path.exists (self.path):
+            os.unlink (self.path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser (description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument ("--socket", help="the socket file to listen on, in $XDG_RUNTIME_DIR or a private temporary directory by default")
+    parser.add_argument ("--native", action="store_true", help="detect violations without pydocstyle")
+    parser.add_argument ("--memo-size", type=int, default=1024, help="number of fixed sources kept in memory")
+    args = parser.parse_args ()
+    try:
+        server = Server (args.socket, Checker (ignore=IGNORED_CODES, convention="pep257", native=args.native), args.memo_size)
+    except OSError as e:
+        sys.exit (f"ERROR: {e}")
+    try:
+        server.serve_forever ()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close ()
@@ -0,0 +1,172 @@
+"""Per-file and per-fixer instrumentation of auto_doc."""
+
+import sys
+import json
+import time
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+# phases of AutoDoc.execute timed for every file, read and write are the I/O and index tokenizes the
+# file to find its docstrings
+PHASES = ["check", "read", "index", "fix", "write"]
+
+# counters recorded for each fixer, memo counts the violations fixed by a region found in the FixMemo
+FIXER_COUNTERS = ["seconds", "seen", "fixed", "skipped", "lines_added", "lines_removed", "memo"]
+
+
+def percentile (values, p):
+    """Return the p-th percentile of values with the nearest-rank method, 0 when values is empty."""
+    if not values:
+        return 0
+    values = sorted (values)
+    return values[max (0, min (len (values) - 1, int (round (p / 100 * len (values))) - 1))]
+
+def peak_rss ():
+    """Return the peak resident set size in bytes of this process and of its largest terminated child.
+
+    :return: a tuple of the two sizes, (None, None) when the platform does not report them
+    :rtype: tuple
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return (resource.getrusage (resource.RUSAGE_SELF).ru_maxrss * unit,
+            resource.getrusage (resource.RUSAGE_CHILDREN).ru_maxrss * unit)
+
+
+class FileStats (object):
+    """Timings and fix counts of one file.
+
+    AutoDoc only records into a FileStats when it is given one, so a run without
+    instrumentation never reads the clock or compares docstrings.
+    """
+
+    def __init__ (self, fname):
+        """Initialize empty counters.
+
+        :param fname: the file being fixed
+        """
+        self.fname = fname
+        self.timings = defaultdict (float)
+        self.fixers = defaultdict (lambda: defaultdict (int))
+        self.changed = False
+
+    def add_time (self, phase, start):
+        """Add the time elapsed since start, a time.perf_counter value, to a phase."""
+        self.timings[phase] += time.perf_counter () - start
+
+    def add_seconds (self, phase, seconds):
+        """Add a runtime measured elsewhere, such as in another process, to a phase."""
+        self.timings[phase] += seconds
+
+    def run_fixer (self, code, fix, contents, doc):
+        """Apply a fixer to a docstring region and record its runtime and what it changed.
+
+        A fixer that leaves the region and the Docstring unchanged declined the violation,
+        which is counted as skipped.
+
+        :param code: the error code of the fixer
+        :param fix: the fixer
+        :param contents: the lines of the docstring region
+        :param doc: the Docstring
+        :return: the Docstring returned by the fixer
+        """
+        counters = self.fixers[code]
+        before = list (contents)
+        start = time.perf_counter ()
+        new_doc = fix (contents, doc)
+        counters["seconds"] += time.perf_counter () - start
+        counters["seen"] += 1
+        if contents == before and new_doc == doc:
+            counters["skipped"] += 1
+        else:
+            counters["fixed"] += 1
+        delta = len (contents) - len (before)
+        counters["lines_added"] += max (delta, 0)
+        counters["lines_removed"] += max (-delta, 0)
+        return new_doc
+
+    def skip (self, codes):
+        """Count the violations of a docstring that could not be found in the file as skipped."""
+        for code in codes:
+            self.fixers[code]["seen"] += 1
+            self.fixers[code]["skipped"] += 1
+
+    def memo_hit (self, codes):
+        """Count the violations of a docstring whose fixed region was found in the memo."""
+        for code in codes:
+            self.fixers[code]["memo"] += 1
+
+    def record (self):
+        """Return the statistics as a dict that can be written as JSON."""
+        fixers = {code: {key: counters[key] for key in FIXER_COUNTERS} for code, counters in self.fixers.items ()}
+        return {
+            "file": self.fname,
+            "changed": self.changed,
+            **{phase: self.timings.get (phase, 0.0) for phase in PHASES},
+            "total": sum (self.timings.values ()),
+            "lines_added": sum (counters["lines_added"] for counters in fixers.values ()),
+            "lines_removed": sum (counters["lines_removed"] for counters in fixers.values ()),
+            "fixers": fixers,
+        }
+
+
+class StatsRecorder (object):
+    """Collect the records of FileStats, write them as JSON lines and summarize them."""
+
+    def __init__ (self, fname=None):
+        """Initialize the recorder.
+
+        :param fname: a file where each record is written as a JSON line, nothing is written when None
+        """
+        self.records = []
+        self.out = open (fname, "w") if fname else None
+
+    def add (self, record):
+        """Add the record of a file."""
+        if record is None:
+            return
+        self.records.append (record)
+        if self.out is not None:
+            self.out.write (json.dumps (record) + "\n")
+
+    def close (self):
+        """Close the JSON lines file."""
+        if self.out is not None:
+            self.out.close ()
+            self.out = None
+
+    def summary (self, slowest=5):
+        """Return a report with percentiles of the per-file timings, per-fixer totals and the slowest files.
+
+        :param slowest: the number of slowest files listed
+        :rtype: str
+        """
+        lines = [f"-----STATS ({len (self.records)} files)-----",
+                 f"{'phase':<8}{'total':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"]
+        for phase in PHASES + ["total"]:
+            values = [record[phase] for record in self.records]
+            lines.append (f"{phase:<8}{sum (values):>10.4f}" +
+                          "".join (f"{percentile (values, p):>10.4f}" for p in (50, 90, 99, 100)))
+        fixers = defaultdict (lambda: defaultdict (int))
+        per_file = defaultdict (list)
+        for record in self.records:
+            for code, counters in record["fixers"].items ():
+                for key, value in counters.items ():
+                    fixers[code][key] += value
+                per_file[code].append (counters["seconds"])
+        lines.append (f"\n{'fixer':<8}{'seconds':>10}{'p90':>10}{'seen':>8}{'fixed':>8}{'skipped':>8}{'+lines':>8}{'-lines':>8}{'memo':>8}")
+        for code in sorted (fixers):
+            counters = fixers[code]
+            lines.append (f"{code:<8}{counters['seconds']:>10.4f}{percentile (per_file[code], 90):>10.4f}" +
+                          "".join (f"{counters[key]:>8}" for key in FIXER_COUNTERS[1:]))
+        lines.append ("\nslowest files:")
+        for record in sorted (self.records, key=lambda record: -record["total"])[:slowest]:
+            lines.append (f"{record['total']:>10.4f}  {record['file']}")
+        return "\n".join (lines) + "\n"
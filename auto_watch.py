@@ -0,0 +1,196 @@
+"""Detect the python files that change under a directory, with inotify or by polling.
+
+InotifyWatcher is used on Linux and PollWatcher, which compares the modification times of
+every file, everywhere else.
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+from auto_check import MATCH_DIR_RE, collect_files, filter_files, iter_files
+
+# inotify events, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+# the header of struct inotify_event: wd, mask, cookie and the length of the name
+EVENT_HEADER = struct.Struct ("iIII")
+
+
+def file_signature (fname):
+    """Return what changes when a file is written, None when the file does not exist."""
+    try:
+        st = os.stat (fname)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+def is_watched (fname, root):
+    """Return True when pydocstyle would check fname while checking the directory root."""
+    parts = os.path.relpath (fname, root).split (os.sep)
+    return (parts[0] != os.pardir and all (MATCH_DIR_RE.match (part) for part in parts[:-1]) and
+            bool (filter_files ([fname])))
+
+
+class PollWatcher (object):
+    """Find changed files by comparing the signature of every file with the previous scan."""
+
+    name = "polling"
+
+    def __init__ (self, path, interval=0.5):
+        """Take the first snapshot of the files.
+
+        :param path: a file or a directory
+        :param interval: the seconds between two scans
+        """
+        self.path = path
+        self.interval = interval
+        self.snapshot = self.scan ()
+
+    def scan (self):
+        """Return a dict from each file under path to its signature."""
+        return {fname: file_signature (fname) for fname in iter_files (self.path)}
+
+    def wait (self, timeout=None):
+        """Return the files created or modified since the last call, an empty set after timeout seconds.
+
+        :param timeout: the maximum number of seconds to wait, forever when None
+        :rtype: set
+        """
+        deadline = None if timeout is None else time.monotonic () + timeout
+        while True:
+            time.sleep (self.interval if deadline is None else max (0, min (self.interval, deadline - time.monotonic ())))
+            snapshot = self.scan ()
+            changed = {fname for fname, signature in snapshot.items () if self.snapshot.get (fname) != signature}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic () >= deadline):
+                return changed
+
+    def close (self):
+        """Nothing to release."""
+
+
+class InotifyWatcher (object):
+    """Find changed files with the events inotify sends for every directory under path."""
+
+    name = "inotify"
+
+    def __init__ (self, path):
+        """Watch path and every directory under it.
+
+        :param path: a file or a directory
+        :raises OSError: when inotify is not available
+        """
+        self.libc = ctypes.CDLL (ctypes.util.find_library ("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1 (os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError (ctypes.get_errno (), "inotify_init1 failed")
+        self.path = path
+        self.is_dir = os.path.isdir (path)
+        self.root = path if self.is_dir else os.path.dirname (path) or os.curdir
+        # directory of each watch descriptor
+        self.dirs = {}
+        try:
+            if self.is_dir:
+                self.add_tree (self.root)
+            else:
+                self.add_dir (self.root)
+        except OSError:
+            self.close ()
+            raise
+
+    def add_dir (self, directory):
+        """Watch the files of a directory."""
+        wd = self.libc.inotify_add_watch (self.fd, os.fsencode (directory), WATCH_MASK)
+        if wd < 0:
+            errnum = ctypes.get_errno ()
+            raise OSError (errnum, f"cannot watch {directory}: {os.strerror (errnum)}")
+        self.dirs[wd] = directory
+
+    def add_tree (self, root):
+        """Watch root and the directories under it that pydocstyle would enter."""
+        for directory, dirs, _ in os.walk (root):
+            dirs[:] = [d for d in dirs if MATCH_DIR_RE.match (d)]
+            self.add_dir (directory)
+
+    def read_events (self):
+        """Return the files named by the pending events, new directories are watched and scanned."""
+        changed = set ()
+        while True:
+            try:
+                data = os.read (self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len (data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from (data, offset)
+                name = os.fsdecode (data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip (b"\0"))
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # events were lost, every file may have changed
+                    changed.update (collect_files (self.path))
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop (wd, None)
+                    continue
+                if wd not in self.dirs:
+                    continue
+                fname = os.path.join (self.dirs[wd], name)
+                if mask & IN_ISDIR:
+                    if self.is_dir and MATCH_DIR_RE.match (name):
+                        self.add_tree (fname)
+                        changed.update (iter_files (fname))
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    changed.add (fname)
+
+    def wait (self, timeout=None):
+        """Return the files created or modified since the last call, an empty set after timeout seconds.
+
+        :param timeout: the maximum number of seconds to wait, forever when None
+        :rtype: set
+        """
+        deadline = None if timeout is None else time.monotonic () + timeout
+        while True:
+            remaining = None if deadline is None else max (0, deadline - time.monotonic ())
+            try:
+                select.select ([self.fd], [], [], remaining)
+            except InterruptedError:
+                continue
+            changed = {fname for fname in self.read_events ()
+                       if (is_watched (fname, self.root) if self.is_dir else
+                           os.path.normpath (fname) == os.path.normpath (self.path))}
+            if changed or (deadline is not None and time.monotonic () >= deadline):
+                return changed
+
+    def close (self):
+        """Close the inotify file descriptor."""
+        if self.fd >= 0:
+            os.close (self.fd)
+            self.fd = -1
+
+
+def make_watcher (path, poll=False, interval=0.5):
+    """Return an InotifyWatcher of path, or a PollWatcher when poll is set or inotify is not available.
+
+    :param path: a file or a directory
+    :param poll: always poll
+    :param interval: the seconds between two scans of a PollWatcher
+    """
+    if not poll and sys.platform.startswith ("linux"):
+        try:
+            return InotifyWatcher (path)
+        except (OSError, AttributeError) as e:
+            # AttributeError: the C library has no inotify functions
+            if getattr (e, "errno", None) == errno.ENOSPC:
+                print ("WARNING: the inotify watch limit is reached, polling instead")
+    return PollWatcher (path, interval)